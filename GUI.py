@@ -1,7 +1,7 @@
 """
 This is the GUI component of my Sudoku project.
 It (1) visualizes a Sudoku board and (2) enables the user to play the game.
-Further, it (3) incorporates button functionality to set the difficulty, go for a new game and
+Further, it (3) incorporates button functionality to set the difficulty and board size, go for a new game and
 (4) automatically solves the board, visually displaying the backtracking algorithm.
 It does all this (5) by using Object-Oriented Programming (OOP).
 It encompasses everything related to the GUI using pygame.
@@ -9,9 +9,15 @@ It encompasses everything related to the GUI using pygame.
 
 import pygame as pg
 import sys
+import time
+import numpy as np
 import solver_and_generator
+import puzzle_bank
+import puzzle_queue
 
 pg.init()
+# ready boards of every difficulty, taken from the puzzle bank file or generated in the background
+puzzles = puzzle_queue.PuzzleQueue(bank=puzzle_bank.PuzzleBank("puzzles.db"))
 
 
 class Board:
@@ -20,17 +26,24 @@ class Board:
     It comes with a multitude of functionality to manipulate selection, values, drawing and more.
     """
 
-    solver_and_generator.generate_new_board()
+    solver_and_generator.board, solver_and_generator.solution = puzzles.get(solver_and_generator.difficulty)
     board = solver_and_generator.board
 
     def __init__(self, rows, cols, width, height):
         self.rows = rows
         self.cols = cols
-        self.cubes = [[Cube(self.board[y][x], y, x, width, height) for x in range(cols)] for y in range(rows)]
+        # size of the squares, the board has box * box rows and columns
+        self.box = int(round(rows ** 0.5))
+        # solution of the current board, None for boards that were not generated (then moves are checked by solving)
+        self.solution = solver_and_generator.solution
+        self.cubes = [[Cube(solver_and_generator.board[y][x], y, x, width, height, rows) for x in range(cols)]
+                      for y in range(rows)]
         self.width = width
         self.height = height
         self.grid = None
         self.selected = None
+        self.stats = solver_and_generator.SearchStats()
+        self.background = self.draw_background()
 
     def update_grid(self):
         """
@@ -46,7 +59,7 @@ class Board:
         :return: Tuple: position (row, col)
         """
         if pos[0] < self.width and pos[1] < self.height:
-            sidelength = self.width / 9
+            sidelength = self.width / self.cols
             x = pos[0] // sidelength
             y = pos[1] // sidelength
             return int(x), int(y)
@@ -93,38 +106,80 @@ class Board:
         """
         row, col = self.selected
         if self.cubes[row][col].value == 0:
-            self.cubes[row][col].set_val(value)
-            self.update_grid()
-
-            if solver_and_generator.possible(col, row, value) and solver_and_generator.solve():
+            if self.is_correct(row, col, value):
+                self.cubes[row][col].set_val(value)
+                self.update_grid()
                 return True
             else:
-                self.cubes[row][col].set_val(0)
                 self.cubes[row][col].set_temp(0)
-                self.update_grid()
                 return False
 
-    def draw(self):
+    def is_correct(self, row, col, value):
         """
-        Draws the grid and the cubes
-        :return: None
+        Checks a move against the stored solution, or by solving the grid if the solution is unknown
+        :param row: int
+        :param col: int
+        :param value: int
+        :return: Boolean
         """
-        global screen
+        if self.solution is not None:
+            return self.solution[row][col] == value
+
+        self.update_grid()
+        return solver_and_generator.Sudoku(np.array(self.grid)).is_correct(row, col, value)
+
+    def draw_background(self):
+        """
+        Draws the grid lines once onto a surface that is reused for every frame
+        :return: pg.Surface
+        """
+        background = pg.Surface((self.width, self.height + 4))
+        background.fill((255, 255, 255))
+
         # Draw Grid Lines
-        sidelength = self.width / 9
+        sidelength = self.width / self.cols
         for y in range(self.rows + 1):
-            if y % 3 == 0:
+            if y % self.box == 0:
                 thick = 4
             else:
                 thick = 1
-            pg.draw.line(screen, (0, 0, 0), (0, y * sidelength), (self.width, y * sidelength), thick)
-            pg.draw.line(screen, (0, 0, 0), (y * sidelength, 0), (y * sidelength, self.height), thick)
+            pg.draw.line(background, (0, 0, 0), (0, y * sidelength), (self.width, y * sidelength), thick)
+            pg.draw.line(background, (0, 0, 0), (y * sidelength, 0), (y * sidelength, self.height), thick)
+
+        return background
+
+    def draw(self):
+        """
+        Draws the grid and the cubes
+        :return: None
+        """
+        global screen
+        screen.blit(self.background, (0, 0))
 
         # Draw Cubes
         for y in range(self.rows):
             for x in range(self.cols):
                 self.cubes[y][x].draw()
 
+    def draw_changes(self):
+        """
+        Redraws only the cubes that changed since they were last drawn
+        :return: List of pg.Rect (the redrawn areas)
+        """
+        global screen
+        rects = []
+
+        for y in range(self.rows):
+            for x in range(self.cols):
+                cube = self.cubes[y][x]
+                if cube.drawn != cube.state():
+                    rect = cube.rect()
+                    screen.blit(self.background, rect, rect)
+                    cube.draw()
+                    rects.append(rect)
+
+        return rects
+
     def clear(self):
         """
         If the cube in question is empty (0), set the temporary value to 0
@@ -150,74 +205,20 @@ class Board:
         Updates the board.cubes using the solver_and_generator.py board
         :return: None
         """
-        for y in range(9):
-            for x in range(9):
+        for y in range(self.rows):
+            for x in range(self.cols):
                 new_val = solver_and_generator.board[y][x]
                 self.cubes[y][x].set_val(new_val)
+        self.solution = solver_and_generator.solution
 
-    def possible(self, y, x, n):
-        """
-        Checks if number n can be input into [y][x] according to Sudoku rules
-        :param y: current y-value of board
-        :param x: current x-value of board
-        :param n: number that is being attempted to be input
-        :return: Boolean
-        """
-
-        # checks if the number already exists in the current row
-        for i in range(9):
-            if self.grid[y][i] == n:
-                return False
-        # checks if the number already exists in the current column
-        for i in range(9):
-            if self.grid[i][x] == n:
-                return False
-        # checks if the number already exists in the current square
-        x0 = (x // 3) * 3
-        y0 = (y // 3) * 3
-        for i in range(3):
-            for j in range(3):
-                if self.grid[y0 + i][x0 + j] == n:
-                    return False
-        # if n does not already exist in its row, column or square, it is possible in location [y][x]
-        return True
-
-    def solve_gui(self):
+    def clear_changes(self):
         """
-        Solves the board using a backtracking algorithm and
-        sets the global board variable to the first possible solution
+        Removes the autosolve coloring of all cubes
         :return: None
         """
-        global board
-        self.update_grid()
-
-        # base case
-        if self.is_finished():
-            return True
-
-        # recursive case
-        else:
-            for y in range(self.rows):
-                for x in range(self.cols):
-                    if self.cubes[x][y].value == 0:
-                        for n in range(1, 10):
-                            if board.possible(x, y, n):
-                                self.cubes[x][y].set_val(n)
-                                self.update_grid()
-                                self.cubes[x][y].draw_change(True)
-                                pg.display.update()
-                                pg.time.delay(100)
-
-                                if board.solve_gui():
-                                    return True
-
-                                self.cubes[x][y].set_val(0)
-                                self.update_grid()
-                                self.cubes[x][y].draw_change(False)
-                                pg.display.update()
-                                pg.time.delay(100)
-
-                        return False
+        for y in range(self.rows):
+            for x in range(self.cols):
+                self.cubes[y][x].change = None
 
 
 class Cube:
@@ -227,57 +228,65 @@ class Cube:
     row = 9
     col = 9
 
-    def __init__(self, value, row, col, width, height):
+    def __init__(self, value, row, col, width, height, size=9):
         self.value = value
         self.temp = 0
         self.row = row
         self.col = col
         self.width = width
         self.height = height
+        # number of cubes per row of the board
+        self.size = size
         self.selected = False
+        # autosolve coloring: True (placed, green), False (removed again, red) or None
+        self.change = None
+        self.removed = 0
+        # state of the cube when it was last drawn, to only redraw cubes that changed
+        self.drawn = None
+
+    def state(self):
+        """
+        Returns everything that decides how the cube looks
+        :return: Tuple
+        """
+        return self.value, self.temp, self.selected, self.change, self.removed
+
+    def rect(self):
+        """
+        Returns the area of the cube on the screen
+        :return: pg.Rect
+        """
+        sidelength = self.width / self.size
+        return pg.Rect(int(self.row * sidelength), int(self.col * sidelength), int(sidelength), int(sidelength))
 
     def draw(self):
         """
-        Draws the cube-values on the board
+        Draws the cube-values on the board, coloring the values changed by the autosolver
         :return: None
         """""
         global screen
 
-        sidelength = self.width / 9
+        sidelength = self.width / self.size
         x = self.row * sidelength
         y = self.col * sidelength
 
-        if self.value == 0 and self.temp != 0:
-            text = font.render(str(self.temp), True, (180, 180, 180))
+        if self.change is False and self.value == 0:
+            text = glyph(self.removed, (255, 0, 0), self.size)
+            screen.blit(text, pg.Vector2((x + (sidelength / 2 - text.get_width() / 2),
+                                          y + (sidelength / 2 - text.get_height() / 2))))
+        elif self.value == 0 and self.temp != 0:
+            text = glyph(self.temp, (180, 180, 180), self.size)
             screen.blit(text, pg.Vector2((x + sidelength - text.get_width() + - 1, y + 3)))
         elif self.value != 0:
-            text = font.render(str(self.value), True, (0, 0, 0))
+            color = (0, 255, 0) if self.change else (0, 0, 0)
+            text = glyph(self.value, color, self.size)
             screen.blit(text, pg.Vector2((x + (sidelength / 2 - text.get_width() / 2),
                                           y + (sidelength / 2 - text.get_height() / 2))))
 
         if self.selected:
             pg.draw.rect(screen, (255, 100, 0), (x, y, sidelength, sidelength), 3)
 
-    def draw_change(self, correct=True):
-        """
-        Draws the changing cubes during the automatic backtracking solving.
-        :param correct: Boolean
-        :return: None
-        """
-        global screen
-
-        sidelength = self.width / 9
-        x = self.row * sidelength
-        y = self.col * sidelength
-
-        pg.draw.rect(screen, (255, 255, 255), (x + 3, y + 3, sidelength - 6, sidelength - 6))
-
-        if correct:
-            text = font.render(str(self.value), True, (0, 255, 0))
-        else:
-            text = font.render(str(self.value), True, (255, 0, 0))
-        screen.blit(text, pg.Vector2((x + (sidelength / 2 - text.get_width() / 2),
-                                      y + (sidelength / 2 - text.get_height() / 2))))
+        self.drawn = self.state()
 
     def set_val(self, value):
         """
@@ -309,6 +318,9 @@ class Button:
         self.height = height
         self.text = text
         self.selected = False
+        self.label = pg.font.SysFont('comicsans', 37).render(text, True, (0, 0, 0)) if text else None
+        # color of the button when it was last drawn, to only redraw buttons that changed
+        self.drawn = None
 
     def draw(self, outline=None):
         """
@@ -323,11 +335,18 @@ class Button:
 
         pg.draw.rect(screen, self.color, (self.x, self.y, self.width, self.height), 0)
 
-        if self.text != '':
-            font_button = pg.font.SysFont('comicsans', 37)
-            text = font_button.render(self.text, True, (0, 0, 0))
-            screen.blit(text, (self.x + (self.width / 2 - text.get_width() / 2),
-                               self.y + (self.height / 2 - text.get_height() / 2)))
+        if self.label:
+            screen.blit(self.label, (self.x + (self.width / 2 - self.label.get_width() / 2),
+                                     self.y + (self.height / 2 - self.label.get_height() / 2)))
+
+        self.drawn = self.color
+
+    def rect(self):
+        """
+        Returns the area of the button on the screen, including the outline
+        :return: pg.Rect
+        """
+        return pg.Rect(self.x - 1, self.y - 1, self.width + 2, self.height + 2)
 
     def is_over(self, pos):
         """
@@ -342,13 +361,14 @@ class Button:
 
         return False
 
-    def select(self):
+    def select(self, buttons=None):
         """
-        Selects a button, used for difficulty button coloring
+        Selects a button, used for difficulty and board size button coloring
+        :param buttons: iterable of Buttons (the group of the button, the difficulty buttons by default)
         :return: None
         """
         global difficulty_buttons
-        for button in difficulty_buttons:
+        for button in (difficulty_buttons if buttons is None else buttons):
             button.color = (225, 225, 245)
             button.selected = False
 
@@ -356,9 +376,178 @@ class Button:
         self.selected = True
 
 
+class Autosolver:
+    """
+    The Autosolver class plays the backtracking solver of a board step by step from the game loop,
+    so the window stays responsive. It can be paused, cancelled, sped up or finished instantly.
+    The solver is a solver_and_generator.Search, which changes one cell per step and can be resumed at any point.
+    """
+    # playback speeds: (name, milliseconds between steps, steps per frame)
+    speeds = [("slow", 250, 1), ("normal", 100, 1), ("fast", 20, 1), ("fast-forward", 0, 50)]
+    # seconds of searching per frame once the animation is skipped, so the window keeps redrawing on hard boards
+    frame_budget = 0.02
+
+    def __init__(self, board):
+        self.board = board
+        self.search = None
+        # True once the animation was skipped and the search runs with a time budget per frame
+        self.instant = False
+        self.backup = None
+        self.paused = False
+        self.speed = 1
+        self.last_step = 0
+
+    def is_running(self):
+        """
+        Checks if an autosolve is in progress
+        :return: Boolean
+        """
+        return self.search is not None
+
+    def start(self):
+        """
+        Starts solving the board, remembering the values to go back to on cancel
+        :return: None
+        """
+        self.backup = [[cube.value for cube in row] for row in self.board.cubes]
+        # row by row without MRV, so the animation fills the board in reading order
+        self.search = solver_and_generator.Search(solver_and_generator.Sudoku(np.array(self.backup)), mrv=False)
+        self.board.stats = self.search.stats
+        self.instant = False
+        self.paused = False
+        self.last_step = 0
+
+    def stop(self):
+        """
+        Stops solving and prints the search statistics
+        :return: None
+        """
+        self.search = None
+        self.instant = False
+        self.board.clear_changes()
+        self.board.update_grid()
+        stats = self.board.stats
+        # the Search only counts nodes, backtracks and depth, not candidate checks or propagations
+        print(f"Autosolve: nodes {stats.nodes}, backtracks {stats.backtracks}, max depth {stats.max_depth}")
+
+    def cancel(self):
+        """
+        Stops solving and puts the board back to how it was before the autosolve
+        :return: None
+        """
+        for y, row in enumerate(self.backup):
+            for x, value in enumerate(row):
+                self.board.cubes[y][x].set_val(value)
+        self.stop()
+
+    def toggle_pause(self):
+        """
+        Pauses or resumes the autosolve
+        :return: None
+        """
+        self.paused = not self.paused
+
+    def change_speed(self, step):
+        """
+        Changes the playback speed
+        :param step: int (+1 faster, -1 slower)
+        :return: None
+        """
+        self.speed = min(max(self.speed + step, 0), len(self.speeds) - 1)
+
+    def finish(self):
+        """
+        Skips the animation and solves the board before the autosolve with a fast search (MRV and propagation),
+        since the row by row search of the animation can take minutes on large boards.
+        The search gets frame_budget seconds per frame until it is done, then the solution is filled in
+        :return: None
+        """
+        sudoku = solver_and_generator.Sudoku(np.array(self.backup))
+        self.search = solver_and_generator.Search(sudoku, mrv=True, propagate=True)
+        self.board.stats = self.search.stats
+        self.instant = True
+        self.paused = False
+        self.update()
+
+    def show_result(self):
+        """
+        Fills the cubes with the solution found, or with the board before the autosolve if there is none
+        :return: None
+        """
+        result = self.search.solution if self.search.solution is not None else self.backup
+        for y in range(self.board.rows):
+            for x in range(self.board.cols):
+                self.board.cubes[y][x].set_val(int(result[y][x]))
+        self.stop()
+
+    def update(self):
+        """
+        Advances the solver according to the playback speed, called once per frame
+        :return: None
+        """
+        if self.search is None or self.paused:
+            return
+
+        if self.instant:
+            if self.search.run(deadline=time.perf_counter() + self.frame_budget) == solver_and_generator.FINISHED:
+                self.show_result()
+            return
+
+        name, delay, steps_per_frame = self.speeds[self.speed]
+        now = pg.time.get_ticks()
+        if now - self.last_step < delay:
+            return
+        self.last_step = now
+
+        for _ in range(steps_per_frame):
+            change = self.search.step()
+            if change is None:
+                self.stop()
+                return
+            y, x, n = change
+            cube = self.board.cubes[y][x]
+            if n:
+                cube.set_val(n)
+                cube.change = True
+            else:
+                cube.removed = cube.value
+                cube.set_val(0)
+                cube.change = False
+        self.board.update_grid()
+
+    def status(self):
+        """
+        Describes the current state of the autosolve for the screen
+        :return: String
+        """
+        if self.search is None:
+            return ""
+        if self.instant:
+            return "Autosolve finishing - C cancel"
+        state = "paused" if self.paused else self.speeds[self.speed][0]
+        return f"Autosolve {state} - P pause, +/- speed, I instant, C cancel"
+
+
+def glyph(value, color, size=9):
+    """
+    Returns the rendered surface of a number, rendering every number, color and board size only once.
+    Numbers from 10 on are shown as letters (A = 10, B = 11, ...), so every number is a single key and character
+    :param value: int
+    :param color: RGB tuple
+    :param size: int (numbers per row of the board, the font shrinks with the cubes)
+    :return: pg.Surface
+    """
+    key = (value, color, size)
+    if key not in glyphs:
+        if size not in fonts:
+            fonts[size] = pg.font.SysFont(name='idc', size=70 * 9 // max(size, 9))
+        glyphs[key] = fonts[size].render(str(value) if value < 10 else chr(ord('A') + value - 10), True, color)
+    return glyphs[key]
+
+
 def draw_screen():
     """
-    Draws the screen
+    Draws the whole screen
     :return: None
     """
 
@@ -368,19 +557,95 @@ def draw_screen():
     autosolve_button.draw(True)
     new_game_button.draw(True)
 
+    display_status()
+    display_lives()
 
-def display_lives():
+
+def update_screen():
     """
-    Displays current lives text and icons in the GUI.
+    Redraws only the parts of the screen that changed since the last frame
+    :return: List of pg.Rect (the redrawn areas)
+    """
+    rects = board.draw_changes()
+
+    for button in (autosolve_button, new_game_button):
+        if button.drawn != button.color:
+            screen.fill((255, 255, 255), button.rect())
+            button.draw(True)
+            rects.append(button.rect())
+
+    if drawn_status != autosolver.status():
+        rects.append(display_status())
+    if drawn_lives != lives:
+        rects.append(display_lives())
+
+    return rects
+
+
+def new_board():
+    """
+    Swaps in a ready board of the current difficulty and board size from the background queue.
+    While the queue has none ready yet, a waiting message is shown and the window keeps handling its events
     :return: None
     """
-    font_button = pg.font.SysFont('comicsans', 20)
-    text = font_button.render('Remaining Lives:', True, (0, 0, 0))
-    screen.blit(text, (553, 755))
+    global board
+    global board_settings
+    board_settings = (solver_and_generator.difficulty, solver_and_generator.box)
+    puzzle = puzzles.get(*board_settings, block=False)
+    while puzzle is None:
+        size = solver_and_generator.box ** 2
+        screen.fill((255, 255, 255))
+        write_text(f"Generating a {size}x{size} board...", small_font, (0, 0, 0), 400)
+        pg.display.update()
+        for event in pg.event.get():
+            if event.type == pg.QUIT:
+                puzzles.stop()
+                pg.quit()
+                sys.exit()
+        clock.tick(10)
+        puzzle = puzzles.get(*board_settings, block=False)
+    solver_and_generator.board, solver_and_generator.solution = puzzle
+
+    if len(solver_and_generator.board) != board.rows:
+        # a different board size needs new cubes
+        size = len(solver_and_generator.board)
+        board = Board(size, size, 720, 720)
+        autosolver.board = board
+    else:
+        board.update_cubes()
+        board.reset_temp()
+
 
+def display_status():
+    """
+    Displays the state of a running autosolve below the board.
+    :return: pg.Rect (the area of the status line)
+    """
+    global drawn_status
+    drawn_status = autosolver.status()
+
+    rect = pg.Rect(0, 723, 540, 32)
+    screen.fill((255, 255, 255), rect)
+    if drawn_status:
+        screen.blit(small_font.render(drawn_status, True, (0, 0, 0)), (18, 728))
+    return rect
+
+
+def display_lives():
+    """
+    Displays current lives text and icons in the GUI.
+    :return: pg.Rect (the area of the lives display)
+    """
     global lives
+    global drawn_lives
+    drawn_lives = lives
+
+    rect = pg.Rect(540, 755, 180, 95)
+    screen.fill((255, 255, 255), rect)
+    screen.blit(lives_text, (553, 755))
     for n in range(lives):
         screen.blit(health_icon, (563 + 50 * n, 790, 60, 60))
+    return rect
 
 
 # Setting up global parameters
@@ -388,8 +653,20 @@ health_icon = pg.image.load('heart.png')
 lives = 3
 
 screen = pg.display.set_mode((720, 850))
-font = pg.font.SysFont(name='idc', size=70)
+clock = pg.time.Clock()
+FPS = 60
+# fonts of the numbers by board size
+fonts = {}
+small_font = pg.font.SysFont('comicsans', 20)
+lives_text = small_font.render('Remaining Lives:', True, (0, 0, 0))
+# rendered numbers by (value, color) and what the status line and lives display showed when last drawn
+glyphs = {}
+drawn_status = None
+drawn_lives = None
 board = Board(9, 9, 720, 720)
+autosolver = Autosolver(board)
+# (difficulty, box size) of the board on screen, None once a new board is due
+board_settings = (solver_and_generator.difficulty, solver_and_generator.box)
 
 # initiate buttons
 start_game_button = Button((225, 225, 225), 445, 730, 220, 70, "Start Game")
@@ -403,6 +680,8 @@ difficulty4 = Button((225, 225, 245), 430, 380, 100, 60, "4")
 difficulty5 = Button((225, 225, 245), 550, 380, 100, 60, "5")
 
 difficulty_buttons = [difficulty1, difficulty2, difficulty3, difficulty4, difficulty5]
+# initiate board size buttons, each with its box size
+size_buttons = {Button((225, 225, 245), 168 + 135 * i, 560, 115, 60, f"{b * b}x{b * b}"): b for i, b in enumerate(range(2, 5))}
 
 
 def setup_titlebar():
@@ -439,12 +718,12 @@ def main_menu():
     :return: None
     """
     setup_titlebar()
+    welcome_font = pg.font.SysFont('comicsans', 37, True)
+    text_font = pg.font.SysFont('comicsans', 30)
+
     while True:
 
         # sets up the main_menu screen
-        welcome_font = pg.font.SysFont('comicsans', 37, True)
-        text_font = pg.font.SysFont('comicsans', 30)
-
         screen.fill((255, 255, 255))
 
         start_game_button.draw(True)
@@ -453,15 +732,19 @@ def main_menu():
         difficulty3.draw()
         difficulty4.draw()
         difficulty5.draw()
+        for button in size_buttons:
+            button.draw()
 
         write_text("Welcome to mudandstars' Sudoku", welcome_font, (0, 0, 0), 60)
         write_text("Please select your desired level", text_font, (0, 0, 0), 250)
         write_text("of difficulty (0-5)", text_font, (0, 0, 0), 300)
+        write_text("and board size", text_font, (0, 0, 0), 490)
 
         for event in pg.event.get():
             pos = pg.mouse.get_pos()
 
             if event.type == pg.QUIT:
+                puzzles.stop()
                 pg.quit()
                 sys.exit()
 
@@ -492,16 +775,21 @@ def main_menu():
                     difficulty5.color = (100, 150, 200)
                 elif not difficulty5.is_over(pos) and not difficulty5.selected:
                     difficulty5.color = (225, 225, 245)
+                for button in size_buttons:
+                    if button.is_over(pos) and not button.selected:
+                        button.color = (100, 150, 200)
+                    elif not button.is_over(pos) and not button.selected:
+                        button.color = (225, 225, 245)
 
             # functionality to enter the game using space
             if event.type == pg.KEYDOWN:
                 if event.key == pg.K_RETURN:
-                    game_loop()
+                    start_game()
 
             # adds functionality to the buttons
             if event.type == pg.MOUSEBUTTONDOWN:
                 if start_game_button.is_over(pos):
-                    game_loop()
+                    start_game()
 
                 if difficulty1.is_over(pos):
                     solver_and_generator.difficulty = 1
@@ -518,8 +806,23 @@ def main_menu():
                 if difficulty5.is_over(pos):
                     solver_and_generator.difficulty = 5
                     difficulty5.select()
+                for button, size in size_buttons.items():
+                    if button.is_over(pos):
+                        solver_and_generator.box = size
+                        button.select(size_buttons)
 
         pg.display.update()
+        clock.tick(FPS)
+
+
+def start_game():
+    """
+    Leaves the main menu for the game, taking a new board if the settings changed or the last game is over
+    :return: None
+    """
+    if board_settings != (solver_and_generator.difficulty, solver_and_generator.box):
+        new_board()
+    game_loop()
 
 
 def game_loop():
@@ -529,17 +832,24 @@ def game_loop():
     """
     setup_titlebar()
     global lives
+    global board_settings
     key = None
 
+    draw_screen()
+    pg.display.update()
+
     while True:
-        draw_screen()
-        display_lives()
-        pg.display.update()
+        autosolver.update()
+        rects = update_screen()
+        if rects:
+            pg.display.update(rects)
+        clock.tick(FPS)
 
         for event in pg.event.get():
             pos = pg.mouse.get_pos()
 
             if event.type == pg.QUIT:
+                puzzles.stop()
                 pg.quit()
                 sys.exit()
 
@@ -554,25 +864,28 @@ def game_loop():
                 elif not new_game_button.is_over(pos):
                     new_game_button.color = (225, 225, 225)
 
+            # controls of a running autosolve, the board cannot be played meanwhile
+            if event.type == pg.KEYDOWN and autosolver.is_running():
+                if event.key == pg.K_p or event.key == pg.K_SPACE:
+                    autosolver.toggle_pause()
+                if event.key == pg.K_PLUS or event.key == pg.K_EQUALS or event.key == pg.K_KP_PLUS:
+                    autosolver.change_speed(1)
+                if event.key == pg.K_MINUS or event.key == pg.K_KP_MINUS:
+                    autosolver.change_speed(-1)
+                if event.key == pg.K_f:
+                    autosolver.speed = len(autosolver.speeds) - 1
+                if event.key == pg.K_i:
+                    autosolver.finish()
+                if event.key == pg.K_c or event.key == pg.K_ESCAPE:
+                    autosolver.cancel()
+                continue
+
             if event.type == pg.KEYDOWN:
-                if event.key == pg.K_1:
-                    key = 1
-                if event.key == pg.K_2:
-                    key = 2
-                if event.key == pg.K_3:
-                    key = 3
-                if event.key == pg.K_4:
-                    key = 4
-                if event.key == pg.K_5:
-                    key = 5
-                if event.key == pg.K_6:
-                    key = 6
-                if event.key == pg.K_7:
-                    key = 7
-                if event.key == pg.K_8:
-                    key = 8
-                if event.key == pg.K_9:
-                    key = 9
+                # numbers 1-9 are typed as digits and numbers from 10 on as letters (A = 10, B = 11, ...)
+                if pg.K_1 <= event.key <= pg.K_9 and event.key - pg.K_0 <= board.rows:
+                    key = event.key - pg.K_0
+                if pg.K_a <= event.key <= pg.K_z and event.key - pg.K_a + 10 <= board.rows:
+                    key = event.key - pg.K_a + 10
 
                 if event.key == pg.K_DELETE or event.key == pg.K_BACKSPACE:
                     board.clear()
@@ -580,13 +893,11 @@ def game_loop():
                 if event.key == pg.K_ESCAPE:
                     for button in difficulty_buttons:
                         button.color = (225, 225, 245)
-                    solver_and_generator.generate_new_board()
-                    board.update_cubes()
-                    board.reset_temp()
+                    board_settings = None
                     lives = 3
                     main_menu()
                 if event.key == pg.K_SPACE:
-                    board.solve_gui()
+                    autosolver.start()
 
                 if event.key == pg.K_RETURN:
                     y, x = board.selected
@@ -600,17 +911,21 @@ def game_loop():
 
             if event.type == pg.MOUSEBUTTONDOWN:
                 click = board.click(pos)
-                if click:
+                if click and not autosolver.is_running():
                     board.select(click[0], click[1])
                     key = None
 
                 if autosolve_button.is_over(pos):
-                    board.solve_gui()
+                    # the button starts the autosolve and cancels it while it is running
+                    if autosolver.is_running():
+                        autosolver.cancel()
+                    else:
+                        autosolver.start()
                     key = None
                 if new_game_button.is_over(pos):
-                    solver_and_generator.generate_new_board()
-                    board.update_cubes()
-                    board.reset_temp()
+                    if autosolver.is_running():
+                        autosolver.stop()
+                    board_settings = None
                     lives = 3
                     for button in difficulty_buttons:
                         button.color = (225, 225, 245)
@@ -620,9 +935,7 @@ def game_loop():
             print("You lost.")
             for button in difficulty_buttons:
                 button.color = (225, 225, 245)
-            solver_and_generator.generate_new_board()
-            board.update_cubes()
-            board.reset_temp()
+            board_settings = None
             lives = 3
             main_menu()
 
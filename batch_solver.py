@@ -0,0 +1,138 @@
+"""
+This is the batch solving component of my Sudoku project.
+It solves many boards at once: candidate masks, naked singles and hidden singles are computed
+as NumPy array operations over the whole batch, and only the boards that logic cannot finish
+are handed to the Sudoku class of solver_and_generator.py one by one.
+"""
+
+import numpy as np
+import puzzle_io
+from solver_and_generator import Sudoku
+
+# bitmask of all numbers 1-9 (bit n set = number n)
+ALL_DIGITS = 0b1111111110
+# cell indices (0-80) of the 27 units: 9 rows, 9 columns and 9 squares
+UNITS = np.array([[y * 9 + x for x in range(9)] for y in range(9)] +
+                 [[y * 9 + x for y in range(9)] for x in range(9)] +
+                 [[(by + y) * 9 + bx + x for y in range(3) for x in range(3)]
+                  for by in range(0, 9, 3) for bx in range(0, 9, 3)])
+# the three units (row, column, square) of every cell
+CELL_UNITS = np.array([[y, 9 + x, 18 + (y // 3) * 3 + x // 3] for y in range(9) for x in range(9)])
+# number of set bits and the highest set bit of every possible mask
+BIT_COUNTS = np.array([bin(mask).count("1") for mask in range(1 << 10)], dtype=np.int8)
+HIGHEST_BIT = np.array([mask.bit_length() - 1 if mask else 0 for mask in range(1 << 10)], dtype=np.int8)
+DIGITS = np.arange(1, 10, dtype=np.int16)
+
+
+def unit_masks(grids):
+    """
+    Computes the bitmask of the numbers used in every unit of every board
+    :param grids: (M, 81) int array
+    :return: (M, 27) int array
+    """
+    bits = np.where(grids > 0, np.left_shift(1, grids.astype(np.int16)), 0).astype(np.int16)
+    return np.bitwise_or.reduce(bits[:, UNITS], axis=2)
+
+
+def propagate(grids):
+    """
+    Fills naked and hidden singles in all boards at the same time until no board changes anymore
+    :param grids: (M, 81) int array, changed in place
+    :return: (M,) bool array (True for boards that turned out to be contradictory)
+    """
+    broken = np.zeros(len(grids), dtype=bool)
+    active = np.arange(len(grids))
+
+    while len(active):
+        current = grids[active]
+        empty = current == 0
+        used = unit_masks(current)
+        candidates = ALL_DIGITS & ~np.bitwise_or.reduce(used[:, CELL_UNITS], axis=2)
+        candidates[~empty] = 0
+        counts = BIT_COUNTS[candidates]
+
+        # an empty cell without candidates means the board cannot be solved
+        dead = (empty & (counts == 0)).any(axis=1)
+
+        # naked singles
+        values = np.where(empty & (counts == 1), HIGHEST_BIT[candidates], 0)
+
+        # hidden singles: numbers that fit into only one cell of a unit
+        bits = ((candidates[:, :, None] >> DIGITS) & 1).astype(np.int8)
+        per_unit = bits[:, UNITS, :].sum(axis=2, dtype=np.int8)
+        missing = (per_unit == 0) & ((used[:, :, None] >> DIGITS) & 1 == 0)
+        dead |= missing.any(axis=(1, 2))
+        hidden = bits.astype(bool) & (per_unit[:, CELL_UNITS, :] == 1).any(axis=2)
+        hidden_counts = hidden.sum(axis=2, dtype=np.int8)
+        dead |= (hidden_counts > 1).any(axis=1)
+        values = np.where((values == 0) & (hidden_counts == 1), hidden.argmax(axis=2) + 1, values)
+
+        values[dead] = 0
+        broken[active[dead]] = True
+        grids[active] = current + values
+
+        active = active[(values > 0).any(axis=1)]
+
+    return broken
+
+
+def is_solved(grids):
+    """
+    Checks which boards are completely and correctly filled in
+    :param grids: (M, 81) int array
+    :return: (M,) bool array
+    """
+    return (grids > 0).all(axis=1) & (unit_masks(grids) == ALL_DIGITS).all(axis=1)
+
+
+def solve_batch(puzzles, chunk_size=10000, backend="dlx"):
+    """
+    Solves a batch of boards, working through it in chunks to keep the memory use bounded
+    :param puzzles: (N, 9, 9) or (N, 81) int array
+    :param chunk_size: int (number of boards propagated together)
+    :param backend: String (solver backend for the boards that need search, "backtracking" or "dlx")
+    :return: Tuple ((N, 9, 9) int array of solutions, (N,) bool array of the boards that could be solved)
+    """
+    puzzles = np.asarray(puzzles).reshape(-1, 81)
+    solutions = puzzles.astype(np.int8)
+    solved = np.zeros(len(puzzles), dtype=bool)
+
+    for start in range(0, len(puzzles), chunk_size):
+        grids = solutions[start:start + chunk_size]
+        broken = propagate(grids)
+
+        # only the boards that logic could not finish are searched one by one
+        for i in np.flatnonzero(~is_solved(grids)):
+            # the simultaneous placements can break a board with a contradiction, so those start from the original
+            grid = puzzles[start + i] if broken[i] else grids[i]
+            sudoku = Sudoku(grid.reshape(9, 9).astype(int))
+            if sudoku.solve(mrv=True, propagate=True, backend=backend):
+                grids[i] = sudoku.board.reshape(81)
+
+        solved[start:start + chunk_size] = is_solved(grids)
+
+    return solutions.reshape(-1, 9, 9), solved
+
+
+def solve_file(path, output, chunk_size=10000, packed=True, backend="dlx"):
+    """
+    Solves the boards of a text or binary file chunk by chunk and writes the solutions to a binary file.
+    Boards that cannot be solved are written as they are
+    :param path: String (input file, see puzzle_io.py)
+    :param output: String (binary output file)
+    :param chunk_size: int (number of boards in memory at once)
+    :param packed: Boolean (write 4 bits per cell instead of one byte per cell)
+    :param backend: String (solver backend for the boards that need search, "backtracking" or "dlx")
+    :return: int (number of boards that could be solved)
+    """
+    solved_total = 0
+
+    def solved_chunks():
+        nonlocal solved_total
+        for chunk in puzzle_io.iter_chunks(path, chunk_size):
+            solutions, solved = solve_batch(chunk, chunk_size, backend)
+            solved_total += int(solved.sum())
+            yield solutions
+
+    puzzle_io.write_binary(output, solved_chunks(), packed)
+    return solved_total
@@ -0,0 +1,251 @@
+"""
+This is the benchmark component of my Sudoku project.
+It measures the hot paths of solver_and_generator.py (solve(), solve_multiple(), remove_numbers() and
+generate_new_board()) on a fixed corpus and reports the median and p95 latency,
+the number of search nodes, backtracks and candidate checks and the maximum search depth.
+The counts come from a separate run with solver_and_generator.TracingSudoku.
+The results can be saved as JSON, so two runs can be compared against each other.
+"""
+
+import argparse
+import json
+import math
+import platform
+import random
+import time
+from statistics import median
+import numpy as np
+from canonical import SolutionCache
+from solver_and_generator import Sudoku, TracingSudoku, board_sample
+
+# fixed puzzles of the corpus: name -> (category, 81-character line)
+PUZZLES = {
+    "easy": ("easy", "003020600900305001001806400008102900700000008006708200002609500800203009005010300"),
+    "medium": ("medium", "200080300060070084030500209000105408000000000402706000301007040720040060004010003"),
+    "hard 1": ("hard", "800000000003600000070090200050007000000045700000100030001000068008500010090000400"),
+    "hard 2": ("hard", "100007090030020008009600500005300900010080002600004000300000010040000007007000300"),
+    "17-clue 1": ("17-clue", "000000010400000000020000000000050407008000300001090000300400200050100000000806000"),
+    "17-clue 2": ("17-clue", "000000012000035000000600070700000300000400800100000000000120000080000040050000600"),
+    "17-clue 3": ("17-clue", "000000012003600000000007000410020000000500300700000600280000040000300500000000000"),
+}
+
+# solver settings that are compared, passed on to solve() and solve_multiple()
+MODES = {
+    "plain": {},
+    "mrv": {"mrv": True},
+    "propagate": {"mrv": True, "propagate": True},
+    "dlx": {"backend": "dlx"},
+    # every repeat after the first one finds a board that takes more than CACHE_AFTER_NODES nodes in the cache
+    "cached": {"mrv": True, "propagate": True, "cache": SolutionCache()},
+}
+# modes that are not counted with a TracingSudoku
+UNTRACED = {"dlx", "cached"}
+# plain row-major backtracking takes minutes on some 17-clue puzzles
+SKIPPED = {("plain", "17-clue")}
+
+
+def parse(line):
+    """
+    Turns an 81-character line into a board
+    :param line: String
+    :return: 9x9 int array
+    """
+    return np.array([int(c) for c in line]).reshape(9, 9)
+
+
+def build_corpus(seed=0):
+    """
+    Builds the benchmark corpus: the board_sample, the fixed puzzles and one generated board per difficulty
+    :param seed: int (seed for the generated boards)
+    :return: List of (name, category, board) tuples
+    """
+    corpus = [("board_sample", "sample", np.array(board_sample))]
+    corpus += [(name, category, parse(line)) for name, (category, line) in PUZZLES.items()]
+
+    for level in range(1, 6):
+        random.seed(seed + level)
+        sudoku = Sudoku(difficulty=level)
+        sudoku.generate_new_board()
+        corpus.append((f"generated {level}", "generated", sudoku.board.copy()))
+
+    return corpus
+
+
+def summarize(timings):
+    """
+    Computes the median and the 95th percentile of a list of timings
+    :param timings: List of floats (seconds)
+    :return: Dictionary (median_ms, p95_ms)
+    """
+    ordered = sorted(timings)
+    p95 = ordered[max(0, math.ceil(0.95 * len(ordered)) - 1)]
+    return {"median_ms": median(ordered) * 1000, "p95_ms": p95 * 1000}
+
+
+def measure(run, repeats):
+    """
+    Runs a function repeatedly, timing every run
+    :param run: function taking the repeat index
+    :param repeats: int
+    :return: Dictionary (median_ms, p95_ms)
+    """
+    timings = []
+    for r in range(repeats):
+        start = time.perf_counter()
+        run(r)
+        timings.append(time.perf_counter() - start)
+    return summarize(timings)
+
+
+def count(run):
+    """
+    Runs a function once on a TracingSudoku, the timings are taken with the plain Sudoku class
+    :param run: function taking a Sudoku class and returning the object it worked on
+    :return: Dictionary (search statistics)
+    """
+    return run(TracingSudoku).stats.as_dict()
+
+
+def bench_solvers(corpus, repeats):
+    """
+    Benchmarks solve() and solve_multiple() in every mode on every board of the corpus
+    :param corpus: List of (name, category, board) tuples
+    :param repeats: int
+    :return: List of result dictionaries
+    """
+    results = []
+    for name, category, grid in corpus:
+        for mode, options in MODES.items():
+            if (mode, category) in SKIPPED:
+                continue
+            for function in ("solve", "solve_multiple"):
+                def run(r, cls=Sudoku):
+                    sudoku = cls(grid.copy())
+                    getattr(sudoku, function)(**options)
+                    return sudoku
+
+                result = {"case": name, "function": function, "mode": mode}
+                result.update(measure(run, repeats))
+                if mode not in UNTRACED:
+                    result.update(count(lambda cls: run(0, cls)))
+                results.append(result)
+    return results
+
+
+def bench_generator(repeats, seed):
+    """
+    Benchmarks fill_board(), remove_numbers() on a fixed solved board and generate_new_board() at every difficulty
+    :param repeats: int
+    :param seed: int
+    :return: List of result dictionaries
+    """
+    solved = Sudoku(np.array(board_sample))
+    solved.solve(mrv=True)
+    results = []
+
+    def fill(r, cls=Sudoku):
+        random.seed(seed + r)
+        sudoku = cls()
+        sudoku.fill_board()
+        return sudoku
+
+    # the grids come from grid_sampler.py, which does not count search steps
+    result = {"case": "solved grid", "function": "fill_board", "mode": "default"}
+    result.update(measure(fill, repeats))
+    results.append(result)
+
+    for level in range(1, 6):
+        def remove(r, cls=Sudoku):
+            random.seed(seed + r)
+            sudoku = cls(solved.board.copy(), level)
+            sudoku.remove_numbers()
+            return sudoku
+
+        def generate(r, cls=Sudoku):
+            random.seed(seed + r)
+            sudoku = cls(difficulty=level)
+            sudoku.generate_new_board()
+            return sudoku
+
+        for function, run in (("remove_numbers", remove), ("generate_new_board", generate)):
+            result = {"case": f"difficulty {level}", "function": function, "mode": "default"}
+            result.update(measure(run, repeats))
+            result.update(count(lambda cls: run(0, cls)))
+            results.append(result)
+
+    return results
+
+
+def run_benchmark(repeats=5, seed=0):
+    """
+    Runs the whole benchmark
+    :param repeats: int (timed runs per case)
+    :param seed: int (seed of the generated corpus and the generator runs)
+    :return: Dictionary (environment and results)
+    """
+    corpus = build_corpus(seed)
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "repeats": repeats,
+        "seed": seed,
+        "results": bench_solvers(corpus, repeats) + bench_generator(repeats, seed),
+    }
+
+
+def print_results(report):
+    """
+    Prints the results of a benchmark run as a table
+    :param report: Dictionary (as returned by run_benchmark())
+    :return: None
+    """
+    print(f"{'case':<16}{'function':<20}{'mode':<11}{'median ms':>11}{'p95 ms':>11}"
+          f"{'nodes':>10}{'backtracks':>12}{'checks':>11}{'depth':>7}")
+    for result in report["results"]:
+        print(f"{result['case']:<16}{result['function']:<20}{result['mode']:<11}"
+              f"{result['median_ms']:>11.2f}{result['p95_ms']:>11.2f}"
+              f"{result.get('nodes', '-'):>10}{result.get('backtracks', '-'):>12}"
+              f"{result.get('checks', '-'):>11}{result.get('max_depth', '-'):>7}")
+
+
+def compare(old_path, new_path):
+    """
+    Compares two saved benchmark runs and prints the speedup of every case
+    :param old_path: String (JSON file of the baseline run)
+    :param new_path: String (JSON file of the new run)
+    :return: None
+    """
+    with open(old_path) as file:
+        old = {(r["case"], r["function"], r["mode"]): r for r in json.load(file)["results"]}
+    with open(new_path) as file:
+        new = json.load(file)["results"]
+
+    print(f"{'case':<16}{'function':<20}{'mode':<11}{'old ms':>11}{'new ms':>11}{'speedup':>9}")
+    for result in new:
+        before = old.get((result["case"], result["function"], result["mode"]))
+        if before is None:
+            continue
+        speedup = before["median_ms"] / result["median_ms"] if result["median_ms"] else float("inf")
+        print(f"{result['case']:<16}{result['function']:<20}{result['mode']:<11}"
+              f"{before['median_ms']:>11.2f}{result['median_ms']:>11.2f}{speedup:>8.2f}x")
+
+
+if __name__ == "__main__":
+    """
+    Runs the benchmark and prints the results, or compares two saved runs
+    """
+    parser = argparse.ArgumentParser(description="Benchmark of the Sudoku solver and generator")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="save the results as JSON")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two saved runs")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+    else:
+        report = run_benchmark(args.repeats, args.seed)
+        print_results(report)
+        if args.output:
+            with open(args.output, "w") as file:
+                json.dump(report, file, indent=2)
@@ -0,0 +1,234 @@
+"""
+This is the canonical form component of my Sudoku project.
+Boards that only differ by the transforms of transforms.py (relabeled numbers, swapped rows, columns,
+bands and stacks, transposition) have the same solutions up to that transform.
+canonicalize() maps every board to the smallest board of its class (row by row, empty cells first),
+so equivalent boards share one key, and SolutionCache stores solutions and solution counts by that key.
+"""
+
+from collections import OrderedDict
+from itertools import permutations, product
+import numpy as np
+
+# the 1296 orders of the 9 rows (or columns) that keep every band (or stack) together
+LINE_ORDERS = np.array([[band * 3 + line for band, lines in zip(bands, inner) for line in lines]
+                        for bands in permutations(range(3))
+                        for inner in product(permutations(range(3)), repeat=3)])
+# place value of every column when a relabeled row is read as a 9-digit number
+PLACES = 10 ** np.arange(8, -1, -1, dtype=np.int64)
+# candidates kept after every row. Only very symmetric boards (almost empty ones) reach this,
+# their keys are then still equivalent boards but not always the smallest one
+MAX_CANDIDATES = 25000
+
+
+def next_rows(rows):
+    """
+    Lists the rows that may come next in every candidate, keeping the bands together
+    :param rows: (M, k) int array (rows chosen so far)
+    :return: (M, options) int array
+    """
+    count, k = rows.shape
+    available = np.ones((count, 9), dtype=bool)
+    available[np.arange(count)[:, None], rows] = False
+
+    band_of = np.arange(9) // 3
+    if k % 3:
+        # the band of the previous row has to be finished first
+        available &= band_of == (rows[:, -1:] // 3)
+    elif k:
+        # a new band starts, it cannot be one that was used already
+        used_bands = np.zeros((count, 3), dtype=bool)
+        used_bands[np.arange(count)[:, None], rows // 3] = True
+        available &= ~used_bands[:, band_of]
+
+    return np.nonzero(available)[1].reshape(count, -1)
+
+
+def has_repeats(board):
+    """
+    Checks if a number appears twice in a row or column
+    :param board: 9x9 int array
+    :return: Boolean
+    """
+    for lines in (board, board.T):
+        for line in lines:
+            numbers = line[line != 0]
+            if len(numbers) != len(set(numbers.tolist())):
+                return True
+    return False
+
+
+def relabel(values, labels, next_label):
+    """
+    Relabels the numbers of the new rows of all candidates in the order they first appear
+    :param values: (M, 9) int array (the new rows)
+    :param labels: (M, 10) int array (labels given so far, 0 for none), changed in place
+    :param next_label: (M,) int array (next free label), changed in place
+    :return: (M, 9) int array
+    """
+    relabeled = np.empty_like(values)
+    index = np.arange(len(values))
+    for x in range(9):
+        value = values[:, x]
+        label = labels[index, value]
+        new = (label == 0) & (value != 0)
+        label[new] = next_label[new]
+        labels[index[new], value[new]] = next_label[new]
+        next_label += new
+        relabeled[:, x] = label
+    return relabeled
+
+
+def canonicalize(board):
+    """
+    Finds the smallest equivalent board. The rows are chosen one after another and only the candidates
+    whose rows so far are the smallest are kept, so the search stays small
+    :param board: 9x9 list or array (0 for empty cells)
+    :return: Tuple (bytes key of the canonical board, transform for apply() and revert())
+    """
+    board = np.asarray(board, dtype=np.int64)
+    grids = np.stack([board, board.T])
+    repeats = has_repeats(board)
+
+    # every candidate: transposed or not, column order, rows chosen so far and the labels given to the numbers
+    transposed = np.repeat([0, 1], len(LINE_ORDERS))
+    cols = np.tile(LINE_ORDERS, (2, 1))
+    rows = np.zeros((len(cols), 0), dtype=np.int64)
+    labels = np.zeros((len(cols), 10), dtype=np.int64)
+    next_label = np.ones(len(cols), dtype=np.int64)
+    canonical = []
+
+    for _ in range(9):
+        options = next_rows(rows)
+        parent = np.repeat(np.arange(len(rows)), options.shape[1])
+        new_rows = options.reshape(-1)
+        values = grids[transposed[parent][:, None], new_rows[:, None], cols[parent]]
+
+        # empty cells sort first, so only the new rows with the leftmost empty cells can be the smallest
+        pattern = (values != 0) @ PLACES
+        keep = np.flatnonzero(pattern == pattern.min())
+        parent, values = parent[keep], values[keep]
+        transposed, cols, labels, next_label = transposed[parent], cols[parent], labels[parent], next_label[parent]
+        rows = np.concatenate([rows[parent], new_rows[keep, None]], axis=1)
+
+        # relabel the numbers of the new row in the order they first appear
+        if rows.shape[1] == 1 and not repeats:
+            # the numbers of a first row are all different, so they are simply counted from left to right
+            filled = values != 0
+            relabeled = np.cumsum(filled, axis=1) * filled
+            labels[np.arange(len(values))[:, None], values] = relabeled
+            labels[:, 0] = 0
+            next_label = filled.sum(axis=1) + 1
+        else:
+            relabeled = relabel(values, labels, next_label)
+
+        codes = relabeled @ PLACES
+        keep = np.flatnonzero(codes == codes.min())[:MAX_CANDIDATES]
+        transposed, cols, rows = transposed[keep], cols[keep], rows[keep]
+        labels, next_label = labels[keep], next_label[keep]
+        canonical.append(relabeled[keep[0]])
+
+    # numbers that do not appear on the board get the remaining labels
+    labels = labels[0]
+    unused = [n for n in range(1, 10) if labels[n] == 0]
+    labels[unused] = np.arange(next_label[0], next_label[0] + len(unused))
+
+    key = np.array(canonical, dtype=np.uint8).tobytes()
+    return key, (bool(transposed[0]), rows[0], cols[0], labels)
+
+
+def apply(transform, board):
+    """
+    Turns a board into the orientation of its canonical form
+    :param transform: Tuple (as returned by canonicalize())
+    :param board: 9x9 list or array
+    :return: 9x9 int array
+    """
+    transposed, rows, cols, labels = transform
+    board = np.asarray(board, dtype=np.int64)
+    if transposed:
+        board = board.T
+    return labels[board[np.ix_(rows, cols)]]
+
+
+def revert(transform, board):
+    """
+    Turns a board in the orientation of the canonical form back into the orientation of the original board
+    :param transform: Tuple (as returned by canonicalize())
+    :param board: 9x9 list or array
+    :return: 9x9 int array
+    """
+    transposed, rows, cols, labels = transform
+    numbers = np.zeros(10, dtype=np.int64)
+    numbers[labels] = np.arange(10)
+
+    original = np.zeros((9, 9), dtype=np.int64)
+    original[np.ix_(rows, cols)] = numbers[np.asarray(board, dtype=np.int64)]
+    return original.T.copy() if transposed else original
+
+
+class SolutionCache:
+    """
+    The SolutionCache class keeps the solutions and solution counts of the most recently used canonical boards.
+    Once maxsize boards are stored, the least recently used one is dropped.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        Looks up what is known about a canonical board
+        :param key: bytes (as returned by canonicalize())
+        :return: Dictionary ("solution" in canonical orientation or None if unsolvable,
+                 "count" and "limit" it was counted with) or None
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+
+    def get_count(self, key, limit):
+        """
+        Looks up the solution count of a canonical board, if it was counted with a limit that answers this one
+        :param key: bytes
+        :param limit: int or None (count all solutions)
+        :return: int (number of solutions, at most limit) or None
+        """
+        entry = self.entries.get(key)
+        if entry is not None and "count" in entry:
+            # a count stopped at its limit is only good for limits up to that one
+            known, known_limit = entry["count"], entry["limit"]
+            if known_limit is None or known < known_limit or (limit is not None and limit <= known_limit):
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return known if limit is None else min(known, limit)
+        self.misses += 1
+        return None
+
+    def put(self, key, **fields):
+        """
+        Stores what is known about a canonical board
+        :param key: bytes
+        :param fields: solution, count and limit
+        :return: None
+        """
+        self.entries.setdefault(key, {}).update(fields)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Removes all stored boards
+        :return: None
+        """
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
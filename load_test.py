@@ -0,0 +1,121 @@
+"""
+This is the load test component of my Sudoku project.
+It sends requests to a running service.py from many connections at once and reports
+the requests per second, the median and tail latency and the errors (timeouts and overloaded answers).
+The solve requests use the puzzles of benchmark.py, or the boards of a puzzle file.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+import numpy as np
+import puzzle_io
+from benchmark import PUZZLES
+
+# share of every operation in the requests sent
+MIX = {"solve": 0.8, "count": 0.1, "validate": 0.08, "generate": 0.02}
+
+
+def make_request(number, rng, boards, ops):
+    """
+    Builds one request
+    :param number: int (request id)
+    :param rng: random.Random
+    :param boards: List of 81-character Strings
+    :param ops: Dictionary (operation -> share)
+    :return: Dictionary
+    """
+    op = rng.choices(list(ops), weights=list(ops.values()))[0]
+    if op == "generate":
+        return {"id": number, "op": op, "difficulty": rng.randint(1, 5)}
+    return {"id": number, "op": op, "board": rng.choice(boards)}
+
+
+async def client(host, port, requests, boards, ops, seed, latencies, errors):
+    """
+    Sends requests over one connection, one after another, and records the latency of every answer
+    :param host: String
+    :param port: int
+    :param requests: int (number of requests to send)
+    :param boards: List of 81-character Strings
+    :param ops: Dictionary (operation -> share)
+    :param seed: int
+    :param latencies: List of floats (seconds, appended to)
+    :param errors: Counter (error messages, counted)
+    :return: None
+    """
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port, limit=1 << 20)
+    for number in range(requests):
+        request = make_request(number, rng, boards, ops)
+        start = time.perf_counter()
+        writer.write((json.dumps(request) + "\n").encode())
+        await writer.drain()
+        response = json.loads(await reader.readline())
+        latencies.append(time.perf_counter() - start)
+        if not response["ok"]:
+            errors[response["error"]] += 1
+    writer.close()
+
+
+async def run(host, port, connections, requests, boards, ops, seed=0):
+    """
+    Runs the load test
+    :param host: String
+    :param port: int
+    :param connections: int (clients sending at the same time)
+    :param requests: int (requests per connection)
+    :param boards: List of 81-character Strings
+    :param ops: Dictionary (operation -> share)
+    :param seed: int
+    :return: Dictionary (results)
+    """
+    latencies = []
+    errors = Counter()
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, requests, boards, ops, seed + c, latencies, errors)
+                           for c in range(connections)))
+    seconds = time.perf_counter() - start
+
+    milliseconds = np.array(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "seconds": seconds,
+        "requests_per_second": len(latencies) / seconds,
+        "p50_ms": float(np.percentile(milliseconds, 50)),
+        "p95_ms": float(np.percentile(milliseconds, 95)),
+        "p99_ms": float(np.percentile(milliseconds, 99)),
+        "max_ms": float(milliseconds.max()),
+        "errors": dict(errors),
+    }
+
+
+if __name__ == "__main__":
+    """
+    Runs the load test against a running service and prints the results
+    """
+    parser = argparse.ArgumentParser(description="Load test of the Sudoku service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=100, help="requests per connection")
+    parser.add_argument("--puzzles", help="text file of boards to solve instead of the benchmark puzzles")
+    parser.add_argument("--only", choices=list(MIX), help="send only this operation")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.puzzles:
+        boards = [puzzle_io.format_line(board) for board in puzzle_io.read_text(args.puzzles)]
+    else:
+        boards = [line for _, line in PUZZLES.values()]
+    ops = {args.only: 1.0} if args.only else MIX
+
+    results = asyncio.run(run(args.host, args.port, args.connections, args.requests, boards, ops, args.seed))
+    print(f"{results['requests']} requests in {results['seconds']:.2f} s, "
+          f"{results['requests_per_second']:.1f} requests per second")
+    print(f"latency p50 {results['p50_ms']:.1f} ms, p95 {results['p95_ms']:.1f} ms, "
+          f"p99 {results['p99_ms']:.1f} ms, max {results['max_ms']:.1f} ms")
+    print(f"errors: {results['errors'] or 'none'}")
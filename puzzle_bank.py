@@ -0,0 +1,132 @@
+"""
+This is the puzzle bank component of my Sudoku project.
+It keeps pre-generated 9x9 boards in an SQLite file together with their solutions, number of clues,
+difficulty level, rating (see rater.py) and how long they took to generate.
+Boards are added in bulk inside one transaction, and taking an unplayed board of a difficulty level
+is a single lookup in an index that only holds the unplayed boards, however large the bank grows.
+"""
+
+import sqlite3
+import puzzle_io
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS puzzles (
+    id INTEGER PRIMARY KEY,
+    board TEXT NOT NULL UNIQUE,
+    solution TEXT NOT NULL,
+    clues INTEGER NOT NULL,
+    difficulty INTEGER NOT NULL,
+    rating REAL,
+    technique TEXT,
+    puzzle_id TEXT,
+    seconds REAL,
+    played INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS unplayed ON puzzles (difficulty, id) WHERE played = 0;
+CREATE INDEX IF NOT EXISTS by_difficulty ON puzzles (difficulty, rating);
+CREATE INDEX IF NOT EXISTS by_clues ON puzzles (clues);
+"""
+
+# columns of a record passed to add(), the ones without a value are stored as NULL
+FIELDS = ("board", "solution", "difficulty", "rating", "technique", "puzzle_id", "seconds")
+
+
+def record(board, solution, difficulty, rating=None, puzzle_id=None, seconds=None):
+    """
+    Builds the record of a board for PuzzleBank.add()
+    :param board: 9x9 list or array (0 for empty cells)
+    :param solution: 9x9 list or array
+    :param difficulty: int (1-5)
+    :param rating: Tuple (float rating, String hardest technique) as returned by rater.rate(), or None
+    :param puzzle_id: String (see puzzle_id.py) or None
+    :param seconds: float (generation time) or None
+    :return: Dictionary
+    """
+    return {
+        "board": puzzle_io.format_line(board),
+        "solution": puzzle_io.format_line(solution),
+        "difficulty": difficulty,
+        "rating": rating[0] if rating else None,
+        "technique": rating[1] if rating else None,
+        "puzzle_id": puzzle_id,
+        "seconds": seconds,
+    }
+
+
+class PuzzleBank:
+    """
+    The PuzzleBank class holds the connection to one bank file and creates the table and indexes if needed.
+    """
+
+    def __init__(self, path="puzzles.db"):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        # the GUI can read the bank while the batch generator writes to it
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+
+    def add(self, records):
+        """
+        Adds boards in one transaction, boards that are already in the bank are skipped
+        :param records: iterable of Dictionaries (see record()), board and solution as 81-digit Strings
+        :return: int (number of boards added)
+        """
+        rows = [{**dict.fromkeys(FIELDS), **entry} for entry in records]
+        for row in rows:
+            row["clues"] = 81 - row["board"].count("0")
+
+        before = self.connection.total_changes
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO puzzles (board, solution, clues, difficulty, rating, technique, puzzle_id, "
+                "seconds) VALUES (:board, :solution, :clues, :difficulty, :rating, :technique, :puzzle_id, :seconds)",
+                rows)
+        return self.connection.total_changes - before
+
+    def take(self, difficulty):
+        """
+        Takes the oldest unplayed board of a difficulty level and marks it as played
+        :param difficulty: int (1-5)
+        :return: Tuple (9x9 int array board, 9x9 int array solution) or None if there is no unplayed board
+        """
+        with self.connection:
+            row = self.connection.execute(
+                "SELECT id, board, solution FROM puzzles WHERE difficulty = ? AND played = 0 ORDER BY id LIMIT 1",
+                (difficulty,)).fetchone()
+            if row is None:
+                return None
+            self.connection.execute("UPDATE puzzles SET played = 1 WHERE id = ?", (row[0],))
+
+        return puzzle_io.parse_line(row[1]).astype(int), puzzle_io.parse_line(row[2]).astype(int)
+
+    def count(self, difficulty=None, played=False):
+        """
+        Counts the boards in the bank
+        :param difficulty: int (1-5) or None for all levels
+        :param played: Boolean (count played instead of unplayed boards) or None for both
+        :return: int
+        """
+        query = "SELECT COUNT(*) FROM puzzles WHERE 1"
+        parameters = []
+        if difficulty is not None:
+            query += " AND difficulty = ?"
+            parameters.append(difficulty)
+        if played is not None:
+            query += " AND played = ?"
+            parameters.append(int(played))
+        return self.connection.execute(query, parameters).fetchone()[0]
+
+    def reset(self):
+        """
+        Marks all boards as unplayed again
+        :return: None
+        """
+        with self.connection:
+            self.connection.execute("UPDATE puzzles SET played = 0 WHERE played = 1")
+
+    def close(self):
+        """
+        Closes the connection to the bank file
+        :return: None
+        """
+        self.connection.close()
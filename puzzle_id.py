@@ -0,0 +1,128 @@
+"""
+This is the puzzle ID component of my Sudoku project.
+A puzzle ID is a short string that holds a seed, a difficulty level and the version of the generator.
+The generator draws every random choice from random.Random(seed), so the same ID always gives the same board,
+on every machine. Only the IDs have to be stored or sent, the boards are generated again when they are needed
+and the most recently used ones are kept in a small LRU cache.
+"""
+
+import argparse
+import random
+from functools import lru_cache
+import numpy as np
+from solver_and_generator import Sudoku, DIFFICULTY_BANDS
+
+# version of the boards the generator makes for a seed. It has to be increased whenever a change to the generator
+# gives different boards for the same seed, so old IDs are rejected instead of turning into other boards
+GENERATOR_VERSION = 1
+# Crockford's base 32 (no I, L, O and U, so IDs are easy to read out and type)
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+SEED_BITS = 64
+
+
+def make_id(seed, difficulty, version=GENERATOR_VERSION):
+    """
+    Packs a seed, a difficulty level and a generator version into a puzzle ID
+    :param seed: int (0 to 2**64 - 1)
+    :param difficulty: int (1-5)
+    :param version: int (0-255)
+    :return: String (14 characters)
+    """
+    if not 0 <= seed < 1 << SEED_BITS:
+        raise ValueError(f"Seed out of range: {seed}")
+    if difficulty not in DIFFICULTY_BANDS:
+        raise ValueError(f"Unknown difficulty: {difficulty}")
+    if not 0 <= version < 256:
+        raise ValueError(f"Version out of range: {version}")
+
+    value = ((version << 3 | difficulty) << SEED_BITS) | seed
+    digits = []
+    while value:
+        value, digit = divmod(value, 32)
+        digits.append(ALPHABET[digit])
+    return "".join(reversed(digits))
+
+
+def parse_id(puzzle_id):
+    """
+    Unpacks a puzzle ID. Lower case letters and the look-alikes I, L and O are accepted as well
+    :param puzzle_id: String
+    :return: Tuple (int seed, int difficulty, int version)
+    """
+    value = 0
+    for char in puzzle_id.strip().upper().replace("I", "1").replace("L", "1").replace("O", "0"):
+        digit = ALPHABET.find(char)
+        if digit < 0:
+            raise ValueError(f"Invalid puzzle ID: {puzzle_id}")
+        value = value * 32 + digit
+
+    seed = value & ((1 << SEED_BITS) - 1)
+    difficulty = (value >> SEED_BITS) & 0b111
+    version = value >> (SEED_BITS + 3)
+    if difficulty not in DIFFICULTY_BANDS or version >= 256:
+        raise ValueError(f"Invalid puzzle ID: {puzzle_id}")
+    return seed, difficulty, version
+
+
+def new_id(difficulty, rng=random):
+    """
+    Draws a new puzzle ID with a random seed
+    :param difficulty: int (1-5)
+    :param rng: random.Random or the random module
+    :return: String
+    """
+    return make_id(rng.getrandbits(SEED_BITS), difficulty)
+
+
+def generate(seed, difficulty):
+    """
+    Generates the board of a seed: a board rated inside the band of the difficulty level, see DIFFICULTY_BANDS
+    :param seed: int
+    :param difficulty: int (1-5)
+    :return: Tuple (int array board, int array solution)
+    """
+    sudoku = Sudoku(difficulty=difficulty, rng=random.Random(seed))
+    sudoku.generate_new_board(band=DIFFICULTY_BANDS[difficulty])
+    return sudoku.board, sudoku.solution
+
+
+@lru_cache(maxsize=256)
+def regenerate(puzzle_id):
+    """
+    Generates the board of a puzzle ID, the last 256 boards are cached.
+    The boards are returned as bytes so the cached values cannot be changed, see load()
+    :param puzzle_id: String
+    :return: Tuple (bytes board, bytes solution)
+    """
+    seed, difficulty, version = parse_id(puzzle_id)
+    if version != GENERATOR_VERSION:
+        raise ValueError(f"Puzzle ID {puzzle_id} was made by generator version {version}, "
+                         f"this is version {GENERATOR_VERSION}")
+    board, solution = generate(seed, difficulty)
+    return board.astype(np.uint8).tobytes(), solution.astype(np.uint8).tobytes()
+
+
+def load(puzzle_id):
+    """
+    Returns the board and solution of a puzzle ID
+    :param puzzle_id: String
+    :return: Tuple (9x9 int array board, 9x9 int array solution)
+    """
+    board, solution = regenerate(puzzle_id)
+    return (np.frombuffer(board, dtype=np.uint8).reshape(9, 9).astype(int),
+            np.frombuffer(solution, dtype=np.uint8).reshape(9, 9).astype(int))
+
+
+if __name__ == "__main__":
+    """
+    Prints the boards of the given puzzle IDs, or new IDs with their boards
+    """
+    parser = argparse.ArgumentParser(description="Sudoku puzzle IDs")
+    parser.add_argument("ids", nargs="*", help="puzzle IDs to print the boards of")
+    parser.add_argument("--new", type=int, default=0, help="number of new IDs to draw")
+    parser.add_argument("--difficulty", type=int, default=2, choices=range(1, 6))
+    args = parser.parse_args()
+
+    for puzzle_id in args.ids + [new_id(args.difficulty) for _ in range(args.new)]:
+        print(puzzle_id)
+        print(np.matrix(load(puzzle_id)[0]))
@@ -0,0 +1,185 @@
+"""
+This is the storage component of my Sudoku project.
+It reads and writes boards in two formats:
+(1) text files with one board of 81 characters per line (0 or . for empty cells) and
+(2) binary files, either one byte per cell or packed with 4 bits per cell.
+Binary files are read through numpy.memmap, so files with millions of boards can be worked through
+in chunks without loading them into memory.
+"""
+
+import os
+import numpy as np
+
+# every binary file starts with one of these headers, telling how the cells are stored
+HEADER_BYTES = b"SDK8"
+HEADER_PACKED = b"SDK4"
+HEADER_SIZE = 4
+
+
+def format_line(board):
+    """
+    Turns a board into its 81-character line
+    :param board: 9x9 list or array
+    :return: String
+    """
+    return "".join(str(int(n)) for n in np.asarray(board).flat)
+
+
+def parse_line(line):
+    """
+    Turns an 81-character line into a board
+    :param line: String (0 or . for empty cells)
+    :return: 9x9 uint8 array
+    """
+    line = line.strip()
+    if len(line) != 81:
+        raise ValueError(f"A board needs 81 characters, got {len(line)}: {line!r}")
+    return np.array([0 if c == "." else int(c) for c in line], dtype=np.uint8).reshape(9, 9)
+
+
+def write_text(path, boards):
+    """
+    Writes boards to a text file, one board per line
+    :param path: String
+    :param boards: iterable of 9x9 boards
+    :return: int (number of boards written)
+    """
+    written = 0
+    with open(path, "w") as file:
+        for board in boards:
+            file.write(format_line(board) + "\n")
+            written += 1
+    return written
+
+
+def iter_text(path):
+    """
+    Reads the boards of a text file one by one, skipping empty lines and lines starting with #
+    :param path: String
+    :return: generator of 9x9 uint8 arrays
+    """
+    with open(path) as file:
+        for line in file:
+            if line.strip() and not line.startswith("#"):
+                yield parse_line(line)
+
+
+def read_text(path):
+    """
+    Reads all boards of a text file
+    :param path: String
+    :return: (N, 9, 9) uint8 array
+    """
+    boards = list(iter_text(path))
+    return np.array(boards, dtype=np.uint8).reshape(-1, 9, 9)
+
+
+def pack(boards):
+    """
+    Packs boards with 4 bits per cell, two cells per byte (the last byte holds only one cell)
+    :param boards: (N, 9, 9) or (N, 81) array
+    :return: (N, 41) uint8 array
+    """
+    cells = np.asarray(boards, dtype=np.uint8).reshape(-1, 81)
+    cells = np.concatenate([cells, np.zeros((len(cells), 1), dtype=np.uint8)], axis=1)
+    return (cells[:, 0::2] << 4) | cells[:, 1::2]
+
+
+def unpack(packed):
+    """
+    Unpacks boards stored with 4 bits per cell
+    :param packed: (N, 41) uint8 array
+    :return: (N, 9, 9) uint8 array
+    """
+    packed = np.asarray(packed, dtype=np.uint8)
+    cells = np.empty((len(packed), 82), dtype=np.uint8)
+    cells[:, 0::2] = packed >> 4
+    cells[:, 1::2] = packed & 0x0F
+    return cells[:, :81].reshape(-1, 9, 9)
+
+
+def write_binary(path, chunks, packed=True):
+    """
+    Writes boards to a binary file. The boards can be passed in chunks, so they never have to be in memory at once
+    :param path: String
+    :param chunks: (N, 9, 9) array or iterable of such arrays
+    :param packed: Boolean (4 bits per cell instead of one byte per cell)
+    :return: int (number of boards written)
+    """
+    if isinstance(chunks, np.ndarray):
+        chunks = [chunks]
+
+    written = 0
+    with open(path, "wb") as file:
+        file.write(HEADER_PACKED if packed else HEADER_BYTES)
+        for chunk in chunks:
+            chunk = np.asarray(chunk, dtype=np.uint8).reshape(-1, 81)
+            file.write((pack(chunk) if packed else chunk).tobytes())
+            written += len(chunk)
+    return written
+
+
+def open_binary(path):
+    """
+    Maps a binary file into memory without reading it
+    :param path: String
+    :return: Tuple (numpy.memmap of shape (N, 81) or (N, 41), Boolean packed)
+    """
+    with open(path, "rb") as file:
+        header = file.read(HEADER_SIZE)
+    if header not in (HEADER_BYTES, HEADER_PACKED):
+        raise ValueError(f"{path} is not a Sudoku binary file")
+
+    packed = header == HEADER_PACKED
+    record = 41 if packed else 81
+    if os.path.getsize(path) == HEADER_SIZE:
+        # an empty file cannot be mapped
+        return np.zeros((0, record), dtype=np.uint8), packed
+    return np.memmap(path, dtype=np.uint8, mode="r", offset=HEADER_SIZE).reshape(-1, record), packed
+
+
+def iter_binary(path, chunk_size=10000):
+    """
+    Reads the boards of a binary file in chunks
+    :param path: String
+    :param chunk_size: int (number of boards per chunk)
+    :return: generator of (M, 9, 9) uint8 arrays
+    """
+    records, packed = open_binary(path)
+    for start in range(0, len(records), chunk_size):
+        chunk = records[start:start + chunk_size]
+        yield unpack(chunk) if packed else np.array(chunk).reshape(-1, 9, 9)
+
+
+def read_binary(path):
+    """
+    Reads all boards of a binary file
+    :param path: String
+    :return: (N, 9, 9) uint8 array
+    """
+    records, packed = open_binary(path)
+    return unpack(records) if packed else np.array(records).reshape(-1, 9, 9)
+
+
+def iter_chunks(path, chunk_size=10000):
+    """
+    Reads the boards of a text or binary file in chunks, telling the format apart by the file header
+    :param path: String
+    :param chunk_size: int (number of boards per chunk)
+    :return: generator of (M, 9, 9) uint8 arrays
+    """
+    with open(path, "rb") as file:
+        header = file.read(HEADER_SIZE)
+
+    if header in (HEADER_BYTES, HEADER_PACKED):
+        yield from iter_binary(path, chunk_size)
+        return
+
+    chunk = []
+    for board in iter_text(path):
+        chunk.append(board)
+        if len(chunk) == chunk_size:
+            yield np.array(chunk, dtype=np.uint8)
+            chunk = []
+    if chunk:
+        yield np.array(chunk, dtype=np.uint8)
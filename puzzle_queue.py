@@ -0,0 +1,135 @@
+"""
+This is the pre-generation component of my Sudoku project.
+A background thread keeps a small buffer of ready boards (with their solutions) for every difficulty level
+and board size,
+so a new game can start right away instead of waiting for generate_new_board().
+Every board gets at most a few seconds, so large boards cannot keep the thread busy for minutes.
+With a puzzle bank (see puzzle_bank.py), unplayed 9x9 boards are taken from the bank first,
+and the boards still waiting in the buffers are added to the bank when the queue stops.
+"""
+
+import threading
+from collections import deque
+import puzzle_bank
+import rater
+from solver_and_generator import Sudoku, DIFFICULTY_BANDS
+
+
+class PuzzleQueue:
+    """
+    The PuzzleQueue class generates boards in a background thread and hands them out by difficulty and box size.
+    Every taken board is replaced by a new one, so the buffers stay full.
+    Buffers for 9x9 boards exist from the start, the other sizes get one when they are first asked for.
+    """
+
+    def __init__(self, levels=(1, 2, 3, 4, 5), size=2, backend="backtracking", rated=True, bank=None, seconds=5.0):
+        self.size = size
+        self.backend = backend
+        # time limit of generate_new_board() per board, the closest board is taken when it runs out
+        self.seconds = seconds
+        # aim for the rating band of every level (see rater.py) instead of just its removal attempts
+        self.rated = rated
+        # puzzle_bank.PuzzleBank or None, only used by the thread that calls get() and stop()
+        self.bank = bank
+        self.buffers = {(level, 3): deque() for level in levels}
+        # (difficulty, box size) of a board someone is waiting for, generated before all others
+        self.wanted = None
+        self.condition = threading.Condition()
+        self.running = True
+        self.worker = threading.Thread(target=self.fill, daemon=True)
+        self.worker.start()
+
+    def generate(self, key):
+        """
+        Generates one board
+        :param key: Tuple (difficulty, box size)
+        :return: Tuple (int array board, int array solution)
+        """
+        level, box = key
+        # rating bands are only defined for 9x9 boards
+        band = DIFFICULTY_BANDS.get(level) if self.rated and box == 3 else None
+        sudoku = Sudoku(difficulty=level, box=box)
+        sudoku.generate_new_board(self.backend, band, seconds=self.seconds)
+        return sudoku.board, sudoku.solution
+
+    def next_level(self):
+        """
+        Chooses the buffer someone is waiting for, or else the emptiest one. Must be called while holding the condition
+        :return: Tuple (difficulty, box size) or None if all buffers are full
+        """
+        if self.wanted is not None and not self.buffers[self.wanted]:
+            return self.wanted
+        emptiest = min(self.buffers, key=lambda key: len(self.buffers[key]))
+        return emptiest if len(self.buffers[emptiest]) < self.size else None
+
+    def fill(self):
+        """
+        Keeps the buffers full, runs in the background thread until stop() is called
+        :return: None
+        """
+        while True:
+            with self.condition:
+                key = self.next_level()
+                while key is None and self.running:
+                    self.condition.wait()
+                    key = self.next_level()
+                if not self.running:
+                    return
+
+            puzzle = self.generate(key)
+
+            with self.condition:
+                self.buffers[key].append(puzzle)
+                self.condition.notify_all()
+
+    def get(self, level, box=3, block=True):
+        """
+        Takes a ready board of the given difficulty and box size.
+        If none is ready yet, it is generated right here, or the background thread is asked for one
+        :param level: int (difficulty)
+        :param box: int (size of the squares)
+        :param block: Boolean (generate a missing board instead of returning None)
+        :return: Tuple (int array board, int array solution) or None if no board is ready and block is False
+        """
+        if self.bank is not None and box == 3:
+            puzzle = self.bank.take(level)
+            if puzzle is not None:
+                return puzzle
+
+        with self.condition:
+            buffer = self.buffers.setdefault((level, box), deque())
+            self.condition.notify_all()
+            if buffer:
+                return buffer.popleft()
+            if not block:
+                self.wanted = (level, box)
+                return None
+
+        return self.generate((level, box))
+
+    def ready(self, level, box=3):
+        """
+        Returns the number of ready boards of the given difficulty and box size
+        :param level: int (difficulty)
+        :param box: int (size of the squares)
+        :return: int
+        """
+        with self.condition:
+            return len(self.buffers.get((level, box), ()))
+
+    def stop(self):
+        """
+        Stops the background thread after the board it is working on and saves the ready 9x9 boards to the bank
+        :return: None
+        """
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+            ready = [(level, puzzle) for (level, box), buffer in self.buffers.items() if box == 3
+                     for puzzle in buffer]
+            for buffer in self.buffers.values():
+                buffer.clear()
+
+        if self.bank is not None and ready:
+            self.bank.add(puzzle_bank.record(board, solution, level, rater.rate(board))
+                          for level, (board, solution) in ready)
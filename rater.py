@@ -0,0 +1,300 @@
+"""
+This is the difficulty rating component of my Sudoku project.
+It solves a board the way a person would, always using the easiest technique that makes progress:
+singles, locked candidates (pointing and claiming), naked and hidden pairs and triples, X-Wing and Swordfish.
+The rating of a board is the rating of the hardest technique it needed.
+Boards that cannot be finished with these techniques need guessing and get the highest rating.
+"""
+
+from itertools import combinations
+
+# cell indices (0-80) of the 27 units: 9 rows, 9 columns and 9 squares
+ROWS = [[y * 9 + x for x in range(9)] for y in range(9)]
+COLS = [[y * 9 + x for y in range(9)] for x in range(9)]
+BOXES = [[(by + y) * 9 + bx + x for y in range(3) for x in range(3)] for by in range(0, 9, 3) for bx in range(0, 9, 3)]
+UNITS = ROWS + COLS + BOXES
+# the cells sharing a row, column or square with every cell
+PEERS = [sorted(set(ROWS[c // 9] + COLS[c % 9] + BOXES[(c // 27) * 3 + (c % 9) // 3]) - {c}) for c in range(81)]
+# row, column and square of every cell
+ROW_OF = [c // 9 for c in range(81)]
+COL_OF = [c % 9 for c in range(81)]
+BOX_OF = [(c // 27) * 3 + (c % 9) // 3 for c in range(81)]
+
+# bitmask of all numbers 1-9 (bit n set = number n)
+ALL_DIGITS = 0b1111111110
+BIT_COUNTS = [bin(mask).count("1") for mask in range(1 << 10)]
+# the numbers contained in every possible mask
+MASK_DIGITS = [[n for n in range(1, 10) if mask & (1 << n)] for mask in range(1 << 10)]
+
+# rating of the boards that need guessing
+SEARCH_RATING = 10.0
+
+
+class Rater:
+    """
+    The Rater class holds the candidates of every cell of a board and solves it with human techniques.
+    Every technique method returns True if it placed a number or removed a candidate.
+    """
+
+    def __init__(self, board):
+        self.values = [int(n) for row in board for n in row]
+        self.candidates = [0] * 81
+        self.broken = False
+        # number of times every technique was used
+        self.uses = {}
+
+        for c in range(81):
+            if self.values[c] == 0:
+                used = 0
+                for p in PEERS[c]:
+                    used |= 1 << self.values[p]
+                self.candidates[c] = ALL_DIGITS & ~used
+                if not self.candidates[c]:
+                    self.broken = True
+
+    def place(self, c, n):
+        """
+        Puts number n into cell c and removes it from the candidates of the peers
+        :param c: int (cell index)
+        :param n: int
+        :return: None
+        """
+        self.values[c] = n
+        self.candidates[c] = 0
+        bit = ~(1 << n)
+        for p in PEERS[c]:
+            self.candidates[p] &= bit
+
+    def eliminate(self, cells, mask):
+        """
+        Removes the numbers of mask from the candidates of cells
+        :param cells: iterable of cell indices
+        :param mask: int (bitmask of numbers)
+        :return: Boolean (True if a candidate was removed)
+        """
+        changed = False
+        for c in cells:
+            if self.candidates[c] & mask:
+                self.candidates[c] &= ~mask
+                changed = True
+        return changed
+
+    def is_solved(self):
+        """
+        Checks if the board is full
+        :return: Boolean
+        """
+        return 0 not in self.values
+
+    def naked_single(self):
+        """
+        Fills every cell that has only one candidate left
+        :return: Boolean
+        """
+        changed = False
+        for c in range(81):
+            mask = self.candidates[c]
+            if self.values[c] == 0 and BIT_COUNTS[mask] <= 1:
+                if not mask:
+                    # an empty cell without candidates means the board cannot be solved
+                    self.broken = True
+                    return False
+                self.place(c, mask.bit_length() - 1)
+                changed = True
+        return changed
+
+    def hidden_single(self):
+        """
+        Fills the numbers that fit into only one cell of a row, column or square
+        :return: Boolean
+        """
+        changed = False
+        for unit in UNITS:
+            once = 0
+            twice = 0
+            for c in unit:
+                mask = self.candidates[c]
+                twice |= once & mask
+                once |= mask
+            for n in MASK_DIGITS[once & ~twice]:
+                for c in unit:
+                    if self.candidates[c] & (1 << n):
+                        self.place(c, n)
+                        changed = True
+                        break
+        return changed
+
+    def positions(self, unit, n):
+        """
+        Lists the cells of a unit that still have number n as a candidate
+        :param unit: List of cell indices
+        :param n: int
+        :return: List of cell indices
+        """
+        bit = 1 << n
+        return [c for c in unit if self.candidates[c] & bit]
+
+    def pointing(self):
+        """
+        If a number of a square can only go into one row (or column) of it,
+        it is removed from the rest of that row (or column)
+        :return: Boolean
+        """
+        for box in BOXES:
+            for n in range(1, 10):
+                cells = self.positions(box, n)
+                if len(cells) < 2:
+                    continue
+                for line_of, lines in ((ROW_OF, ROWS), (COL_OF, COLS)):
+                    line = line_of[cells[0]]
+                    if all(line_of[c] == line for c in cells[1:]):
+                        if self.eliminate([c for c in lines[line] if c not in box], 1 << n):
+                            return True
+        return False
+
+    def claiming(self):
+        """
+        If a number of a row (or column) can only go into one square,
+        it is removed from the rest of that square
+        :return: Boolean
+        """
+        for line in ROWS + COLS:
+            for n in range(1, 10):
+                cells = self.positions(line, n)
+                if len(cells) < 2:
+                    continue
+                box = BOX_OF[cells[0]]
+                if all(BOX_OF[c] == box for c in cells[1:]):
+                    if self.eliminate([c for c in BOXES[box] if c not in line], 1 << n):
+                        return True
+        return False
+
+    def naked_subset(self, size):
+        """
+        If size cells of a unit only have size numbers between them,
+        those numbers are removed from the other cells of the unit
+        :param size: int (2 for pairs, 3 for triples)
+        :return: Boolean
+        """
+        for unit in UNITS:
+            cells = [c for c in unit if 2 <= BIT_COUNTS[self.candidates[c]] <= size]
+            for subset in combinations(cells, size):
+                mask = 0
+                for c in subset:
+                    mask |= self.candidates[c]
+                if BIT_COUNTS[mask] == size:
+                    if self.eliminate([c for c in unit if c not in subset], mask):
+                        return True
+        return False
+
+    def hidden_subset(self, size):
+        """
+        If size numbers of a unit fit into only size cells,
+        all other candidates are removed from those cells
+        :param size: int (2 for pairs, 3 for triples)
+        :return: Boolean
+        """
+        for unit in UNITS:
+            places = {}
+            for n in range(1, 10):
+                cells = self.positions(unit, n)
+                if 2 <= len(cells) <= size:
+                    places[n] = cells
+            for numbers in combinations(places, size):
+                cells = set()
+                for n in numbers:
+                    cells.update(places[n])
+                if len(cells) == size:
+                    mask = 0
+                    for n in numbers:
+                        mask |= 1 << n
+                    if self.eliminate(cells, ALL_DIGITS & ~mask):
+                        return True
+        return False
+
+    def fish(self, size):
+        """
+        If a number fits into the same size columns in size rows, it is removed from the rest of those columns
+        (and the same with rows and columns swapped). Size 2 is the X-Wing and size 3 the Swordfish
+        :param size: int
+        :return: Boolean
+        """
+        for lines, cross, cross_of in ((ROWS, COLS, COL_OF), (COLS, ROWS, ROW_OF)):
+            for n in range(1, 10):
+                places = {}
+                for i, line in enumerate(lines):
+                    cells = self.positions(line, n)
+                    if 2 <= len(cells) <= size:
+                        places[i] = {cross_of[c] for c in cells}
+                for chosen in combinations(places, size):
+                    covered = set()
+                    for i in chosen:
+                        covered |= places[i]
+                    if len(covered) == size:
+                        chosen_cells = {c for i in chosen for c in lines[i]}
+                        others = [c for j in covered for c in cross[j] if c not in chosen_cells]
+                        if self.eliminate(others, 1 << n):
+                            return True
+        return False
+
+    def naked_pair(self):
+        return self.naked_subset(2)
+
+    def naked_triple(self):
+        return self.naked_subset(3)
+
+    def hidden_pair(self):
+        return self.hidden_subset(2)
+
+    def hidden_triple(self):
+        return self.hidden_subset(3)
+
+    def x_wing(self):
+        return self.fish(2)
+
+    def swordfish(self):
+        return self.fish(3)
+
+    def solve(self):
+        """
+        Solves the board, always using the easiest technique that makes progress
+        :return: Tuple (float rating, String hardest technique)
+        """
+        hardest = (0.0, "none")
+
+        while not self.is_solved() and not self.broken:
+            for name, rating, technique in TECHNIQUES:
+                if technique(self):
+                    self.uses[name] = self.uses.get(name, 0) + 1
+                    hardest = max(hardest, (rating, name))
+                    break
+            else:
+                return SEARCH_RATING, "search"
+
+        if self.broken:
+            return SEARCH_RATING, "search"
+        return hardest
+
+
+# the techniques from easiest to hardest: (name, rating, method)
+TECHNIQUES = [
+    ("hidden single", 1.5, Rater.hidden_single),
+    ("naked single", 2.3, Rater.naked_single),
+    ("pointing", 2.6, Rater.pointing),
+    ("claiming", 2.8, Rater.claiming),
+    ("naked pair", 3.0, Rater.naked_pair),
+    ("x-wing", 3.2, Rater.x_wing),
+    ("hidden pair", 3.4, Rater.hidden_pair),
+    ("naked triple", 3.6, Rater.naked_triple),
+    ("swordfish", 3.8, Rater.swordfish),
+    ("hidden triple", 4.0, Rater.hidden_triple),
+]
+
+
+def rate(board):
+    """
+    Rates how hard a board is for a person
+    :param board: 9x9 list or array (0 for empty cells)
+    :return: Tuple (float rating, String hardest technique)
+    """
+    return Rater(board).solve()
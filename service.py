@@ -0,0 +1,478 @@
+"""
+This is the service component of my Sudoku project.
+It serves the solver and generator over a local TCP socket with one JSON object per line:
+a request like {"id": 1, "op": "solve", "board": "003020600..."} gets a response like
+{"id": 1, "ok": true, "solved": true, "solution": "483921657..."}. The operations are solve, resume, count,
+generate, validate and stats. The CPU work runs in a bounded pool of worker processes,
+so requests never share solver state.
+Small solve requests that arrive within a few milliseconds of each other are sent to a worker as one batch.
+Every request has a timeout, and a server with too many requests in flight answers "overloaded" right away
+instead of queueing without bound. A connection that sends faster than it is answered stops being read from.
+The backtracking solver runs as a solver_and_generator.Search and the dlx solver checks the same budget,
+so both stop at the timeout (or after the "nodes" of the request) and no board can keep a worker busy for longer. A solve request with "resumable": true gets
+the state of a search that ran out of budget, and a resume request with that "state" goes on from there.
+Every worker keeps the solutions and counts of the 9x9 boards that took it longer than a few search nodes
+in solver_and_generator.solution_cache, so a board (or an equivalent one) that comes back is looked up instead.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import puzzle_id
+import puzzle_io
+from solver_and_generator import Sudoku, Search, BUDGET_EXHAUSTED, FINISHED, SOLVED, UNSOLVABLE, solution_cache
+
+# share of the timeout of a request that its search may run for
+SEARCH_SHARE = 0.9
+
+
+def read_board(value):
+    """
+    Turns the board of a request into an array
+    :param value: String (81 characters, 0 or . for empty cells) or list of rows
+    :return: int array
+    """
+    if isinstance(value, str):
+        return puzzle_io.parse_line(value).astype(int)
+
+    board = np.array(value, dtype=int)
+    size = len(board)
+    box = int(round(size ** 0.5))
+    if board.shape != (size, size) or box * box != size or size == 0:
+        raise ValueError(f"A board needs box * box rows of box * box numbers, got shape {board.shape}")
+    if board.min() < 0 or board.max() > size:
+        raise ValueError(f"The numbers of a {size}x{size} board have to be between 0 and {size}")
+    return board
+
+
+def write_board(board):
+    """
+    Turns a board into its JSON form: 81 characters for 9x9 boards, a list of rows otherwise
+    :param board: int array
+    :return: String or list
+    """
+    board = np.asarray(board, dtype=int)
+    return puzzle_io.format_line(board) if board.shape == (9, 9) else board.tolist()
+
+
+def read_number(request, name, default=None, low=0, whole=True):
+    """
+    Reads a numeric field of a request, so bad values are rejected before any work is sent to a worker
+    :param request: Dictionary
+    :param name: String (name of the field)
+    :param default: default value if the field is missing
+    :param low: smallest allowed value
+    :param whole: Boolean (only whole numbers are allowed)
+    :return: int, float or the default value
+    """
+    value = request.get(name, default)
+    if value is None:
+        return None
+    kinds = int if whole else (int, float)
+    if isinstance(value, bool) or not isinstance(value, kinds) or not math.isfinite(value):
+        raise ValueError(f'"{name}" has to be a {"whole" if whole else "finite"} number')
+    if value < low:
+        raise ValueError(f'"{name}" has to be at least {low}')
+    return value
+
+
+def has_conflicts(board):
+    """
+    Checks if a number appears twice in a row, column or square
+    :param board: int array
+    :return: Boolean
+    """
+    size = len(board)
+    box = int(round(size ** 0.5))
+    squares = board.reshape(box, box, box, box).transpose(0, 2, 1, 3).reshape(size, size)
+    for units in (board, board.T, squares):
+        for unit in units:
+            numbers = unit[unit != 0]
+            if len(numbers) != len(np.unique(numbers)):
+                return True
+    return False
+
+
+def solve_boards(boards, backend="backtracking", expires=None, nodes=None):
+    """
+    Solves a batch of boards in a worker process.
+    Both backends give up on a board at the time its request expires or once it used nodes
+    :param boards: List of boards (as sent in the requests)
+    :param backend: String ("backtracking" or "dlx")
+    :param expires: List of floats (time.time() at which the search of every board has to stop) or None
+    :param nodes: int (search nodes every board may use) or None
+    :return: List of Dictionaries (the result of every board)
+    """
+    results = []
+    for i, value in enumerate(boards):
+        # time.time() is the same in every process, the deadline of the search is counted in perf_counter()
+        deadline = None if expires is None else time.perf_counter() + expires[i] - time.time()
+        try:
+            board = read_board(value)
+        except ValueError as error:
+            results.append({"ok": False, "error": str(error)})
+            continue
+        sudoku = Sudoku(board)
+        if has_conflicts(board):
+            status = UNSOLVABLE
+        else:
+            status = sudoku.solve_within(nodes, deadline, backend=backend, cache=solution_cache)
+        solved = status == SOLVED
+        results.append({"ok": True, "solved": solved, "status": status,
+                        "solution": write_board(sudoku.board) if solved else None})
+    return results
+
+
+def search_board(value=None, state=None, seconds=None, nodes=None):
+    """
+    Solves a board in a worker process, or goes on with a search that ran out of budget before.
+    The state of the search is returned if it runs out of budget again
+    :param value: board (as sent in the request) or None if a state is given
+    :param state: Dictionary (as returned by Search.as_dict()) or None
+    :param seconds: float (time budget) or None
+    :param nodes: int (search nodes it may use) or None
+    :return: Dictionary
+    """
+    if state is None:
+        board = read_board(value)
+        if has_conflicts(board):
+            return {"solved": False, "status": UNSOLVABLE, "solution": None}
+        search = Search(Sudoku(board), limit=1, propagate=True)
+    else:
+        read_board(state["board"])
+        search = Search.from_dict(state)
+
+    deadline = None if seconds is None else time.perf_counter() + seconds
+    if search.run(nodes, deadline) == BUDGET_EXHAUSTED:
+        return {"solved": False, "status": BUDGET_EXHAUSTED, "solution": None, "state": search.as_dict()}
+    solved = search.solution is not None
+    return {"solved": solved, "status": SOLVED if solved else UNSOLVABLE,
+            "solution": write_board(search.solution) if solved else None}
+
+
+def count_board(value, limit=2, backend="backtracking", seconds=None, nodes=None):
+    """
+    Counts the solutions of a board in a worker process.
+    If the search runs out of budget, the count is the number of solutions found until then
+    :param value: board (as sent in the request)
+    :param limit: int (stop counting at limit) or None
+    :param backend: String ("backtracking" or "dlx")
+    :param seconds: float (time budget) or None
+    :param nodes: int (search nodes it may use) or None
+    :return: Dictionary
+    """
+    board = read_board(value)
+    if has_conflicts(board):
+        status, count = FINISHED, 0
+    else:
+        deadline = None if seconds is None else time.perf_counter() + seconds
+        status, count = Sudoku(board).count_within(limit, nodes, deadline, backend, solution_cache)
+    return {"count": count, "limit": limit, "status": status}
+
+
+def validate_board(value, seconds=None, nodes=None):
+    """
+    Checks a board in a worker process: no number may appear twice in a unit and it needs exactly one solution
+    :param value: board (as sent in the request)
+    :param seconds: float (time budget) or None
+    :param nodes: int (search nodes it may use) or None
+    :return: Dictionary (valid and unique are None if the check ran out of budget)
+    """
+    board = read_board(value)
+    if has_conflicts(board):
+        return {"valid": False, "unique": False, "reason": "a number appears twice in a row, column or square"}
+    deadline = None if seconds is None else time.perf_counter() + seconds
+    status, count = Sudoku(board).count_within(2, nodes, deadline, cache=solution_cache)
+    if status == BUDGET_EXHAUSTED and count < 2:
+        return {"valid": count > 0 or None, "unique": None, "reason": BUDGET_EXHAUSTED}
+    reason = None if count == 1 else ("no solution" if count == 0 else "more than one solution")
+    return {"valid": count > 0, "unique": count == 1, "reason": reason}
+
+
+def generate_board(difficulty=2, seed=None, requested_id=None):
+    """
+    Generates the board of a puzzle ID (see puzzle_id.py) in a worker process.
+    Without an ID, a new one is made from the seed (a random one if no seed is given)
+    :param difficulty: int (1-5)
+    :param seed: int or None
+    :param requested_id: String or None
+    :return: Dictionary
+    """
+    if requested_id is None:
+        requested_id = puzzle_id.new_id(difficulty) if seed is None else puzzle_id.make_id(seed, difficulty)
+    board, solution = puzzle_id.load(requested_id)
+    return {"puzzle_id": requested_id, "board": write_board(board), "solution": write_board(solution)}
+
+
+class Batcher:
+    """
+    The Batcher class collects solve requests for up to wait seconds (or until size requests are waiting)
+    and solves them in one worker task, so small requests do not pay for a round trip to a worker each.
+    Every board keeps the time budget of its own request.
+    """
+
+    def __init__(self, pool, backend, size=8, wait=0.002):
+        self.pool = pool
+        self.backend = backend
+        self.size = size
+        self.wait = wait
+        self.waiting = []
+        self.timer = None
+        self.batches = 0
+
+    def add(self, board, seconds):
+        """
+        Adds a board to the next batch
+        :param board: board (as sent in the request)
+        :param seconds: float (time budget of the request, counted from now)
+        :return: asyncio.Future (resolves to the result Dictionary of the board)
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.waiting.append((board, time.time() + seconds, future))
+        if len(self.waiting) >= self.size:
+            self.flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.wait, self.flush)
+        return future
+
+    def flush(self):
+        """
+        Sends the waiting boards to a worker
+        :return: None
+        """
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.waiting = self.waiting, []
+        if batch:
+            self.batches += 1
+            asyncio.ensure_future(self.run(batch))
+
+    async def run(self, batch):
+        """
+        Solves a batch in the pool and hands every request its result
+        :param batch: List of (board, expiry time, future) tuples
+        :return: None
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.pool, solve_boards, [board for board, _, _ in batch],
+                                                 self.backend, [expires for _, expires, _ in batch])
+        except Exception as error:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+class SudokuService:
+    """
+    The SudokuService class answers the requests of all connections.
+    A request that times out is answered with an error. The searches of both solver backends stop by themselves
+    at the timeout, the generator finishes the task it was given.
+    """
+
+    def __init__(self, workers=None, max_pending=None, per_connection=32, timeout=10.0, batch_size=8,
+                 batch_wait=0.002):
+        self.workers = workers or os.cpu_count()
+        # requests in flight over all connections, more are answered with "overloaded"
+        self.max_pending = max_pending or self.workers * 32
+        # requests in flight per connection, a connection is not read from while it has this many
+        self.per_connection = per_connection
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.pool = None
+        self.batchers = {}
+        self.pending = 0
+        self.handled = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        """
+        Runs the service until it is cancelled or gets SIGTERM
+        :param host: String
+        :param port: int
+        :return: None
+        """
+        # spawned workers do not inherit the listening socket, so they can never keep the port open on their own
+        self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        server = await asyncio.start_server(self.handle, host, port, limit=1 << 20)
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        print(f"Serving on {host}:{port} with {self.workers} workers")
+        try:
+            async with server:
+                await server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+    async def handle(self, reader, writer):
+        """
+        Reads the requests of one connection and writes every response as soon as it is ready
+        :param reader: asyncio.StreamReader
+        :param writer: asyncio.StreamWriter
+        :return: None
+        """
+        slots = asyncio.Semaphore(self.per_connection)
+        tasks = set()
+
+        async def respond(line):
+            try:
+                response = await self.respond(line)
+                writer.write((json.dumps(response) + "\n").encode())
+                await writer.drain()
+            except ConnectionError:
+                pass
+            finally:
+                slots.release()
+
+        try:
+            while True:
+                await slots.acquire()
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.ensure_future(respond(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.wait(tasks)
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, line):
+        """
+        Answers one request line
+        :param line: bytes (one JSON object)
+        :return: Dictionary (the response)
+        """
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("A request has to be a JSON object")
+        except ValueError as error:
+            return {"id": None, "ok": False, "error": f"Invalid request: {error}"}
+
+        response = {"id": request.get("id")}
+        if request.get("op") != "stats" and self.pending >= self.max_pending:
+            self.rejected += 1
+            response.update(ok=False, error="overloaded")
+            return response
+
+        try:
+            timeout = min(read_number(request, "timeout", self.timeout, whole=False), self.timeout)
+            # the work of a timed out request goes on in the pool, so it stays pending until it is done
+            self.pending += 1
+            work = asyncio.ensure_future(self.dispatch(request, timeout))
+            work.add_done_callback(self.work_done)
+            result = await asyncio.wait_for(asyncio.shield(work), timeout)
+            response.update({"ok": True, **result})
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            response.update(ok=False, error="timeout")
+        except (ValueError, TypeError, KeyError, IndexError) as error:
+            response.update(ok=False, error=str(error))
+        except Exception as error:
+            # every request gets an answer, whatever went wrong
+            response.update(ok=False, error=f"Internal error: {type(error).__name__}: {error}")
+        finally:
+            self.handled += 1
+        return response
+
+    def work_done(self, work):
+        """
+        Counts the work of a request as done, also when the request timed out before
+        :param work: asyncio.Future (the dispatch() of the request)
+        :return: None
+        """
+        self.pending -= 1
+        if not work.cancelled():
+            # retrieves the error of a timed out request, which nobody awaits anymore
+            work.exception()
+
+    async def dispatch(self, request, timeout):
+        """
+        Runs the operation of a request
+        :param request: Dictionary
+        :param timeout: float (seconds the request may take)
+        :return: Dictionary (the fields of the response)
+        """
+        loop = asyncio.get_running_loop()
+        op = request.get("op")
+        backend = request.get("backend", "backtracking")
+        if backend not in ("backtracking", "dlx"):
+            raise ValueError(f"Unknown solver backend: {backend}")
+        nodes = read_number(request, "nodes", low=1)
+        # the search stops a little before the timeout, so its answer arrives before the request times out
+        seconds = timeout * SEARCH_SHARE
+
+        if op == "solve":
+            board = request["board"]
+            if request.get("resumable") and backend == "backtracking":
+                return await loop.run_in_executor(self.pool, search_board, board, None, seconds, nodes)
+            if isinstance(board, str) and nodes is None:
+                # 9x9 boards are small enough to be solved in batches
+                if backend not in self.batchers:
+                    self.batchers[backend] = Batcher(self.pool, backend, self.batch_size, self.batch_wait)
+                result = await self.batchers[backend].add(board, seconds)
+            else:
+                result = (await loop.run_in_executor(self.pool, solve_boards, [board], backend,
+                                                   [time.time() + seconds], nodes))[0]
+            if not result.pop("ok"):
+                raise ValueError(result["error"])
+            return result
+        if op == "resume":
+            if not isinstance(request["state"], dict):
+                raise ValueError("The state of a search has to be a JSON object")
+            return await loop.run_in_executor(self.pool, search_board, None, request["state"], seconds, nodes)
+        if op == "count":
+            return await loop.run_in_executor(self.pool, count_board, request["board"], read_number(request, "limit", 2, 1),
+                                              backend, seconds, nodes)
+        if op == "validate":
+            return await loop.run_in_executor(self.pool, validate_board, request["board"], seconds, nodes)
+        if op == "generate":
+            difficulty = read_number(request, "difficulty", 2, 1)
+            return await loop.run_in_executor(self.pool, generate_board, difficulty, read_number(request, "seed"),
+                                              request.get("puzzle_id"))
+        if op == "stats":
+            return {"pending": self.pending, "handled": self.handled, "rejected": self.rejected,
+                    "timed_out": self.timed_out, "batches": sum(b.batches for b in self.batchers.values())}
+        raise ValueError(f"Unknown operation: {op}")
+
+
+if __name__ == "__main__":
+    """
+    Starts the service
+    """
+    parser = argparse.ArgumentParser(description="Sudoku solver and generator service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--max-pending", type=int, help="requests in flight before new ones are rejected")
+    parser.add_argument("--timeout", type=float, default=10.0, help="longest time a request may take in seconds")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--batch-wait", type=float, default=0.002, help="seconds a solve request waits for others")
+    args = parser.parse_args()
+
+    service = SudokuService(args.workers, args.max_pending, timeout=args.timeout, batch_size=args.batch_size,
+                            batch_wait=args.batch_wait)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -2,10 +2,22 @@
 This is the Sudoku solver and generator component of my Sudoku Project.
 It is capable of (1) creating entirely new Sudoku puzzles with varying difficulties and
 (2) solving them for a single solution or multiple solutions.
+The Sudoku class holds its own board and counters, so several puzzles can be worked on at once.
+The module functions work on the global board and are kept for the GUI and scripts.
 """
 
+import argparse
+import contextlib
+import os
+import random
+import time
+from multiprocessing import Pool
 import numpy as np
-from random import randint, shuffle
+import canonical
+import grid_sampler
+import puzzle_bank
+import rater
+import transforms
 
 # initialises global board, solution counter and difficulty level
 board_sample = [[7, 0, 0, 4, 0, 0, 1, 2, 0],
@@ -20,25 +32,1281 @@ board_sample = [[7, 0, 0, 4, 0, 0, 1, 2, 0],
 board = []
 counter = 0
 difficulty = 2
+# size of the squares of the global board, the board has box * box rows and columns (3 for the classic 9x9 board)
+box = 3
+# complete solution of the global board, known for generated boards and None otherwise
+solution = None
 
+# number of cells filled by logic (naked and hidden singles) and by guessing during the last solver run
+logic_placements = 0
+search_placements = 0
 
-def generate_empty_board():
+# rating bands (see rater.py) that generate_new_board() aims for at every difficulty level:
+# 1 hidden singles, 2 naked singles, 3 locked candidates, 4 subsets and fish, 5 guessing
+DIFFICULTY_BANDS = {1: (0, 1.5), 2: (2.3, 2.3), 3: (2.6, 2.8), 4: (3.0, 4.0), 5: (rater.SEARCH_RATING, rater.SEARCH_RATING)}
+
+# removals that may fail per difficulty level before remove_numbers() stops. On boards larger than 9x9
+# a failed uniqueness check takes up to a second, so they get fewer to stay within a few seconds per board
+ATTEMPTS_PER_LEVEL = 10
+LARGE_ATTEMPTS_PER_LEVEL = 3
+
+# results of a search with a budget (see Search.run()) and of Sudoku.solve_within()
+FINISHED = "finished"
+BUDGET_EXHAUSTED = "budget exhausted"
+SOLVED = "solved"
+UNSOLVABLE = "unsolvable"
+# search nodes a board gets before it is looked up in a SolutionCache. Canonicalizing a board costs about as much
+# as 25-40 nodes of the propagating search, and most boards are solved with far fewer
+CACHE_AFTER_NODES = 25
+
+# bitmask of all numbers 1-9 (bit n set = number n)
+ALL_DIGITS = 0b1111111110
+# number of set bits for every possible mask, used to count the candidates of a cell
+BIT_COUNTS = [bin(mask).count("1") for mask in range(1 << 10)]
+
+
+class BitCounter:
     """
-    Generates an (almost) empty 9x9 board in the global board variable
+    Counts the set bits of a mask like the BIT_COUNTS table does, for boards too large for a table.
+    """
+
+    def __getitem__(self, mask):
+        return bin(mask).count("1")
+
+
+# bit count tables by board size, boards of more than 16 numbers count the bits one mask at a time
+bit_counts = {9: BIT_COUNTS}
+
+
+def get_bit_counts(size):
+    """
+    Returns the bit count table for the masks of a board size
+    :param size: int (numbers per row)
+    :return: List or BitCounter
+    """
+    if size not in bit_counts:
+        bit_counts[size] = [bin(mask).count("1") for mask in range(1 << (size + 1))] if size <= 16 else BitCounter()
+    return bit_counts[size]
+
+
+def build_exact_cover(box=3):
+    """
+    Builds the Dancing Links matrix of the empty Sudoku as an exact cover problem.
+    Every row stands for a number n in cell [y][x] and covers four columns:
+    the cell itself, n in row y, n in column x and n in the square of [y][x].
+    Node 0 is the root, nodes 1-324 are the column headers (on a 9x9 board).
+    :param box: int (size of the squares)
+    :return: Tuple of lists (left, right, up, down, column, row, size)
+    """
+    n_size = box * box
+    cells = n_size * n_size
+    columns = 4 * cells
+    left = [i - 1 for i in range(columns + 1)]
+    right = [i + 1 for i in range(columns + 1)]
+    left[0] = columns
+    right[columns] = 0
+    up = list(range(columns + 1))
+    down = list(range(columns + 1))
+    column = list(range(columns + 1))
+    row = [-1] * (columns + 1)
+    size = [0] * (columns + 1)
+
+    for y in range(n_size):
+        for x in range(n_size):
+            for n in range(n_size):
+                row_id = (y * n_size + x) * n_size + n
+                first = len(column)
+                for c in (1 + y * n_size + x, 1 + cells + y * n_size + n, 1 + 2 * cells + x * n_size + n,
+                          1 + 3 * cells + ((y // box) * box + x // box) * n_size + n):
+                    node = len(column)
+                    column.append(c)
+                    row.append(row_id)
+                    up.append(up[c])
+                    down.append(c)
+                    down[up[c]] = node
+                    up[c] = node
+                    left.append(node - 1)
+                    right.append(node + 1)
+                    size[c] += 1
+                left[first] = first + 3
+                right[first + 3] = first
+
+    return left, right, up, down, column, row, size
+
+
+exact_cover = build_exact_cover()
+# exact cover matrices by box size, the others are built when first needed
+exact_covers = {3: exact_cover}
+
+
+class Sudoku:
+    """
+    The Sudoku class holds a board together with everything the solver and generator need:
+    the difficulty, the solution counter and the bitmasks of the numbers used in every row, column and square.
+    Every object is independent, so different boards can be solved and generated at the same time.
+    """
+
+    def __init__(self, board=None, difficulty=2, box=3, rng=random):
+        # the box size follows from the board if one is given
+        if board is not None:
+            box = int(round(len(board) ** 0.5))
+        self.resize(box)
+        self.board = np.array(np.zeros((self.size, self.size))) if board is None else board
+        self.difficulty = difficulty
+        # every random choice of the generator comes from rng, a seeded random.Random reproduces the same boards
+        self.rng = rng
+        self.counter = 0
+        # complete solution of a generated board, None if unknown
+        self.solution = None
+        # (rating, hardest technique) of the board, None if it was not rated
+        self.rating = None
+        # ((difficulty, box, band), board, solution, rating) of the last board generated from scratch,
+        # multiplied by generate_new_board(transform=True)
+        self.template = None
+        # grid_sampler.GridSampler that fill_board() takes complete boards from, created when first needed
+        self.sampler = None
+        self.logic_placements = 0
+        self.search_placements = 0
+
+        self.update_masks()
+
+    def resize(self, box):
+        """
+        Sets the box size, the board itself has to be replaced to match it
+        :param box: int (size of the squares, the board has box * box rows and columns)
+        :return: None
+        """
+        self.box = box
+        self.size = box * box
+        # bitmask of all numbers of the board and the bit count table for its masks
+        self.all_digits = (1 << (self.size + 1)) - 2
+        self.bit_counts = get_bit_counts(self.size)
+        # bitmasks of the numbers used in every row, column and square (bit n set = number n used)
+        self.row_masks = [0] * self.size
+        self.col_masks = [0] * self.size
+        self.box_masks = [0] * self.size
+
+    def generate_empty_board(self):
+        """
+        Generates an (almost) empty board
+        :return: None
+        """
+        # initialize empty board
+        self.board = np.array(np.zeros((self.size, self.size)))
+
+        # randomly populate the grid
+        populate_numbers = [i for i in range(self.size)]
+        self.rng.shuffle(populate_numbers)
+        while populate_numbers:
+            y = self.rng.randint(0, self.size - 1)
+            x = self.rng.randint(0, self.size - 1)
+            if self.board[y][x] == 0:
+                self.board[y][x] = populate_numbers.pop()
+
+        self.update_masks()
+
+    def check_board(self):
+        """
+        Checks if the board is full
+        :return: Boolean
+        """
+        for y in range(self.size):
+            for x in range(self.size):
+                if self.board[y][x] == 0:
+                    return False
+        return True
+
+    def remove_numbers(self, backend="backtracking", symmetric=False, clues=None, deadline=None):
+        """
+        Removes numbers from the board to eventually arrive at a non-filled-in board with only one solution.
+        Every filled cell is tried once, in random order. The higher the difficulty int, the more removals
+        may fail before it stops (ATTEMPTS_PER_LEVEL per level, LARGE_ATTEMPTS_PER_LEVEL above 9x9)
+        and the potentially harder the sudoku will be
+        :param backend: String (name of the solver backend used for the uniqueness check, "backtracking" or "dlx")
+        :param symmetric: Boolean (remove every cell together with its mirror image through the center)
+        :param clues: int (keep removing until only this many numbers are left, however many removals fail) or None
+        :param deadline: float (time.perf_counter() value after which no more cells are tried) or None
+        :return: None
+        """
+        attempts = self.difficulty * (ATTEMPTS_PER_LEVEL if self.box <= 3 else LARGE_ATTEMPTS_PER_LEVEL)
+        self.update_masks()
+        # the empty cells are shared by all uniqueness checks, so the search starts from the order it left them in
+        empty = self.empty_cells()
+        filled = [(y, x) for y in range(self.size) for x in range(self.size) if self.board[y][x] != 0]
+        self.rng.shuffle(filled)
+        left = len(filled)
+        last = self.size - 1
+
+        for y, x in filled:
+            if (attempts <= 0 if clues is None else left <= clues):
+                break
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            if self.board[y][x] == 0:
+                # already removed together with its mirror image
+                continue
+
+            group = [(y, x)]
+            if symmetric and (last - y, last - x) != (y, x) and self.board[last - y][last - x] != 0:
+                group.append((last - y, last - x))
+
+            # the board had one solution before, so removing a number keeps it unique
+            # unless the board can also be solved with a different number in that cell
+            removed = []
+            for cy, cx in group:
+                n = int(self.board[cy][cx])
+                self.remove_value(cy, cx, n)
+                empty.append((cy, cx))
+                removed.append((cy, cx, n))
+                if not self.is_forced(cy, cx, n) and self.has_other_solution(cy, cx, n, empty, backend, deadline):
+                    for ry, rx, rn in removed:
+                        self.set_value(ry, rx, rn)
+                        empty.remove((ry, rx))
+                    attempts -= 1
+                    break
+            else:
+                left -= len(group)
+
+        # every removal that was kept left the board with exactly one solution
+        self.counter = 1
+
+    def is_forced(self, y, x, n):
+        """
+        Checks if number n is the only number that fits into the empty cell [y][x], or if no other empty cell
+        of its row, column or square can take it. Then every solution has n in [y][x]
+        :param y: current row of board
+        :param x: current column of board
+        :param n: number that was removed from [y][x]
+        :return: Boolean
+        """
+        if self.candidates(y, x) == 1 << n:
+            return True
+
+        b = self.box
+        top, left = y - y % b, x - x % b
+        units = ([(y, i) for i in range(self.size)],
+                 [(i, x) for i in range(self.size)],
+                 [(top + i // b, left + i % b) for i in range(self.size)])
+        for unit in units:
+            if not any(self.board[cy][cx] == 0 and (cy, cx) != (y, x) and self.possible(cy, cx, n)
+                       for cy, cx in unit):
+                return True
+        return False
+
+    def has_other_solution(self, y, x, n, cells, backend="backtracking", deadline=None):
+        """
+        Checks if the board can be solved with a number other than n in the empty cell [y][x].
+        If the board had exactly one solution with n in [y][x], this tells if emptying [y][x] made it ambiguous.
+        With a deadline, the backtracking check runs as a Search that stops at the deadline,
+        and a check that did not finish counts as another solution, so the number is kept
+        :param y: current row of board
+        :param x: current column of board
+        :param n: number that was removed from [y][x]
+        :param cells: List of all empty (row, column) tuples, reordered in place by the search
+        :param backend: String ("backtracking" or "dlx")
+        :param deadline: float (time.perf_counter() value to give up at) or None
+        :return: Boolean
+        """
+        if backend not in ("backtracking", "dlx"):
+            raise ValueError(f"Unknown solver backend: {backend}")
+
+        free = self.candidates(y, x) & ~(1 << n)
+        # the cell is filled first, so the search runs over the other empty cells
+        i = cells.index((y, x))
+        cells[0], cells[i] = cells[i], cells[0]
+
+        while free:
+            bit = free & -free
+            free ^= bit
+            m = bit.bit_length() - 1
+            self.set_value(y, x, m)
+            if backend == "dlx":
+                found = self.count_solutions(limit=1, backend="dlx")
+            elif deadline is not None:
+                search = Search(Sudoku(np.array(self.board, dtype=int)), limit=1, propagate=True)
+                found = search.run(deadline=deadline) == BUDGET_EXHAUSTED or search.found
+            else:
+                self.counter = 0
+                self.search_all(cells, 1, mrv=True, propagate=True, limit=1)
+                found = self.counter
+            self.remove_value(y, x, m)
+            if found:
+                return True
+        return False
+
+    def update_masks(self):
+        """
+        Rebuilds the row, column and box bitmasks from the board.
+        Needs to be called whenever the board is changed without using set_value() or remove_value()
+        :return: None
+        """
+        b = self.box
+        for i in range(self.size):
+            self.row_masks[i] = 0
+            self.col_masks[i] = 0
+            self.box_masks[i] = 0
+
+        for y in range(self.size):
+            for x in range(self.size):
+                n = int(self.board[y][x])
+                if n != 0:
+                    bit = 1 << n
+                    self.row_masks[y] |= bit
+                    self.col_masks[x] |= bit
+                    self.box_masks[(y // b) * b + x // b] |= bit
+
+    def set_value(self, y, x, n):
+        """
+        Puts number n into [y][x] and marks it as used in the respective row, column and square
+        :param y: current row of board
+        :param x: current column of board
+        :param n: number that is being put in the board
+        :return: None
+        """
+        self.board[y][x] = n
+        bit = 1 << n
+        b = self.box
+        self.row_masks[y] |= bit
+        self.col_masks[x] |= bit
+        self.box_masks[(y // b) * b + x // b] |= bit
+
+    def remove_value(self, y, x, n):
+        """
+        Empties [y][x] and marks number n as free again in the respective row, column and square
+        :param y: current row of board
+        :param x: current column of board
+        :param n: number that is being removed from the board
+        :return: None
+        """
+        self.board[y][x] = 0
+        bit = ~(1 << n)
+        b = self.box
+        self.row_masks[y] &= bit
+        self.col_masks[x] &= bit
+        self.box_masks[(y // b) * b + x // b] &= bit
+
+    def candidates(self, y, x):
+        """
+        Returns the bitmask of all numbers that can be input into [y][x] according to Sudoku rules
+        :param y: current row of board
+        :param x: current column of board
+        :return: int (bit n set = number n is possible)
+        """
+        b = self.box
+        return self.all_digits & ~(self.row_masks[y] | self.col_masks[x] | self.box_masks[(y // b) * b + x // b])
+
+    def possible(self, y, x, n):
+        """
+        Checks if number n can be input into [y][x] according to Sudoku rules
+        :param y: current row of board
+        :param x: current column of board
+        :param n: number that is being attempted to be put in the board
+        :return: Boolean
+        """
+        # n is possible if it is not yet used in its row, column or square
+        b = self.box
+        return not (self.row_masks[y] | self.col_masks[x] | self.box_masks[(y // b) * b + x // b]) & (1 << n)
+
+    def empty_cells(self):
+        """
+        Lists the empty cells of the board in row-major order
+        :return: List of (row, column) tuples
+        """
+        return [(y, x) for y in range(self.size) for x in range(self.size) if self.board[y][x] == 0]
+
+    def most_constrained(self, cells, i):
+        """
+        Moves the empty cell with the fewest candidates (from index i onwards) to index i
+        :param cells: List of empty (row, column) tuples
+        :param i: index of the first cell that is not filled yet
+        :return: int (candidate bitmask of the chosen cell, 0 if a cell has no candidates left)
+        """
+        rows, cols, boxes = self.row_masks, self.col_masks, self.box_masks
+        all_digits, counts, b = self.all_digits, self.bit_counts, self.box
+        best = i
+        best_free = self.candidates(*cells[i])
+        best_count = counts[best_free]
+
+        for j in range(i + 1, len(cells)):
+            if best_count <= 1:
+                break
+            y, x = cells[j]
+            free = all_digits & ~(rows[y] | cols[x] | boxes[(y // b) * b + x // b])
+            if counts[free] < best_count:
+                best, best_free, best_count = j, free, counts[free]
+
+        cells[i], cells[best] = cells[best], cells[i]
+        return best_free
+
+    def place_singles(self, cells, i):
+        """
+        Fills naked singles (cells with only one candidate) and hidden singles (numbers that fit into only one cell
+        of a row, column or square) until no more cells can be filled by logic.
+        Filled cells are moved to the front of the unfilled part of cells.
+        :param cells: List of empty (row, column) tuples
+        :param i: index of the first cell that is not filled yet
+        :return: int (index of the first cell that is still empty, -1 if the board turned out to be unsolvable)
+        """
+        start = i
+        changed = True
+        size, b, counts = self.size, self.box, self.bit_counts
+
+        while changed and i < len(cells):
+            changed = False
+            once = [0] * (3 * size)
+            twice = [0] * (3 * size)
+            frees = {}
+
+            # naked singles, collecting which numbers fit once or more than once into every row, column and square
+            for j in range(i, len(cells)):
+                y, x = cells[j]
+                free = self.candidates(y, x)
+                if free == 0:
+                    self.undo_placements(cells, start, i)
+                    return -1
+                if counts[free] == 1:
+                    self.set_value(y, x, free.bit_length() - 1)
+                    cells[i], cells[j] = cells[j], cells[i]
+                    i += 1
+                    self.logic_placements += 1
+                    changed = True
+                    continue
+                frees[y, x] = free
+                for unit in (y, size + x, 2 * size + (y // b) * b + x // b):
+                    twice[unit] |= once[unit] & free
+                    once[unit] |= free
+
+            if changed:
+                continue
+
+            # every number that is missing in a unit has to fit somewhere, numbers that fit only once are hidden singles
+            for unit in range(3 * size):
+                if unit < size:
+                    used = self.row_masks[unit]
+                elif unit < 2 * size:
+                    used = self.col_masks[unit - size]
+                else:
+                    used = self.box_masks[unit - 2 * size]
+                if (once[unit] | used) != self.all_digits:
+                    self.undo_placements(cells, start, i)
+                    return -1
+                once[unit] &= ~twice[unit]
+
+            for j in range(i, len(cells)):
+                y, x = cells[j]
+                hidden = (once[y] | once[size + x] | once[2 * size + (y // b) * b + x // b]) & frees[y, x]
+                if hidden == 0:
+                    continue
+                if counts[hidden] != 1 or not hidden & self.candidates(y, x):
+                    # two numbers need the same cell or the number was taken away by an earlier placement
+                    self.undo_placements(cells, start, i)
+                    return -1
+                self.set_value(y, x, hidden.bit_length() - 1)
+                cells[i], cells[j] = cells[j], cells[i]
+                i += 1
+                self.logic_placements += 1
+                changed = True
+
+        return i
+
+    def undo_placements(self, cells, start, end):
+        """
+        Empties the cells from index start up to (excluding) index end again
+        :param cells: List of (row, column) tuples
+        :param start: int
+        :param end: int
+        :return: None
+        """
+        for y, x in cells[start:end]:
+            self.remove_value(y, x, int(self.board[y][x]))
+
+    def search_all(self, cells, i, mrv=False, propagate=False, limit=None):
+        """
+        Backtracks over the empty cells from index i onwards and adds every solution found to the counter
+        :param cells: List of empty (row, column) tuples
+        :param i: index of the cell that is filled next
+        :param mrv: Boolean (branch on the most constrained cell instead of the next cell in row-major order)
+        :param propagate: Boolean (fill naked and hidden singles before branching)
+        :param limit: int (stop as soon as the counter reaches limit) or None (find all solutions)
+        :return: Boolean (True if the search stopped because the limit was reached)
+        """
+        filled = i
+        if propagate:
+            filled = self.place_singles(cells, i)
+            if filled < 0:
+                return False
+
+        if filled == len(cells):
+            self.counter += 1
+        else:
+            free = self.most_constrained(cells, filled) if mrv else self.candidates(*cells[filled])
+            y, x = cells[filled]
+            while free:
+                bit = free & -free
+                free ^= bit
+                n = bit.bit_length() - 1
+                self.set_value(y, x, n)
+                self.search_placements += 1
+                stop = self.search_all(cells, filled + 1, mrv, propagate, limit)
+                self.remove_value(y, x, n)
+                if stop:
+                    break
+
+        self.undo_placements(cells, i, filled)
+        return limit is not None and self.counter >= limit
+
+    def search_first(self, cells, i, mrv=False, propagate=False):
+        """
+        Backtracks over the empty cells from index i onwards and stops at the first solution
+        :param cells: List of empty (row, column) tuples
+        :param i: index of the cell that is filled next
+        :param mrv: Boolean (branch on the most constrained cell instead of the next cell in row-major order)
+        :param propagate: Boolean (fill naked and hidden singles before branching)
+        :return: Boolean (True if a solution was found)
+        """
+        filled = i
+        if propagate:
+            filled = self.place_singles(cells, i)
+            if filled < 0:
+                return False
+
+        if filled == len(cells):
+            return True
+
+        free = self.most_constrained(cells, filled) if mrv else self.candidates(*cells[filled])
+        y, x = cells[filled]
+        while free:
+            bit = free & -free
+            free ^= bit
+            n = bit.bit_length() - 1
+            self.set_value(y, x, n)
+            self.search_placements += 1
+            if self.search_first(cells, filled + 1, mrv, propagate):
+                return True
+            self.remove_value(y, x, n)
+
+        self.undo_placements(cells, i, filled)
+        return False
+
+    def dlx_search(self, limit=1):
+        """
+        Solves the board as an exact cover problem using Dancing Links (Knuth's Algorithm X)
+        and sets the board to the first solution found
+        :param limit: int (stop after this many solutions) or None (count all solutions)
+        :return: int (number of solutions found)
+        """
+        return self.dlx_run(limit)[1]
+
+    def dlx_run(self, limit=1, nodes=None, deadline=None):
+        """
+        Runs dlx_search() with a budget: it gives up after a number of search nodes or at a deadline.
+        The board is set to the first solution found, also if the budget ran out after it was found
+        :param limit: int (stop after this many solutions) or None (count all solutions)
+        :param nodes: int (search nodes it may use) or None
+        :param deadline: float (time.perf_counter() value to give up at) or None
+        :return: Tuple (String FINISHED or BUDGET_EXHAUSTED, int number of solutions found)
+        """
+        if self.box not in exact_covers:
+            exact_covers[self.box] = build_exact_cover(self.box)
+        left, right, up, down, column, row, size = [list(part) for part in exact_covers[self.box]]
+        n_size = self.size
+        cells = n_size * n_size
+
+        def cover(c):
+            left[right[c]] = left[c]
+            right[left[c]] = right[c]
+            i = down[c]
+            while i != c:
+                j = right[i]
+                while j != i:
+                    up[down[j]] = up[j]
+                    down[up[j]] = down[j]
+                    size[column[j]] -= 1
+                    j = right[j]
+                i = down[i]
+
+        def uncover(c):
+            i = up[c]
+            while i != c:
+                j = left[i]
+                while j != i:
+                    size[column[j]] += 1
+                    up[down[j]] = j
+                    down[up[j]] = j
+                    j = left[j]
+                i = up[i]
+            left[right[c]] = c
+            right[left[c]] = c
+
+        # the given numbers are part of every solution, so their rows are selected right away
+        covered = set()
+        for y in range(n_size):
+            for x in range(n_size):
+                n = int(self.board[y][x])
+                if n == 0:
+                    continue
+                node = 4 * cells + 1 + ((y * n_size + x) * n_size + n - 1) * 4
+                for j in range(node, node + 4):
+                    if column[j] in covered:
+                        return FINISHED, 0
+                    covered.add(column[j])
+                    cover(column[j])
+
+        selected = []
+        solution = []
+        found = 0
+        visited = 0
+        exhausted = False
+
+        def search():
+            nonlocal found, visited, exhausted
+            visited += 1
+            if (nodes is not None and visited > nodes) or (deadline is not None and time.perf_counter() > deadline):
+                # the links are copies, so the search can stop without uncovering anything
+                exhausted = True
+                return True
+            if right[0] == 0:
+                found += 1
+                if not solution:
+                    solution.extend(selected)
+                return limit is not None and found >= limit
+
+            # branch on the column with the fewest remaining rows
+            c = right[0]
+            j = right[c]
+            while j != 0:
+                if size[j] < size[c]:
+                    c = j
+                j = right[j]
+            if size[c] == 0:
+                return False
+
+            cover(c)
+            i = down[c]
+            while i != c:
+                selected.append(row[i])
+                j = right[i]
+                while j != i:
+                    cover(column[j])
+                    j = right[j]
+                if search():
+                    return True
+                j = left[i]
+                while j != i:
+                    uncover(column[j])
+                    j = left[j]
+                selected.pop()
+                i = down[i]
+            uncover(c)
+            return False
+
+        search()
+
+        for row_id in solution:
+            y, x, n = row_id // cells, row_id // n_size % n_size, row_id % n_size + 1
+            self.board[y][x] = n
+        self.update_masks()
+        return (BUDGET_EXHAUSTED if exhausted else FINISHED), found
+
+    def solve_multiple(self, mrv=False, propagate=False, backend="backtracking", limit=None, cache=None):
+        """
+        Solves the board using a backtracking algorithm and
+        updates the counter to the number of possible solutions
+        :param mrv: Boolean (always branch on the cell with the fewest candidates)
+        :param propagate: Boolean (fill naked and hidden singles at every step before guessing)
+        :param backend: String ("backtracking" or "dlx" for Dancing Links)
+        :param limit: int (stop counting once limit solutions are found) or None (count all solutions)
+        :param cache: canonical.SolutionCache (looked up for boards that take more than CACHE_AFTER_NODES nodes,
+                      9x9 boards only) or None
+        :return: None
+        """
+        if cache is not None and self.box == 3:
+            self.counter = self.count_within(limit, backend=backend, cache=cache)[1]
+            return
+
+        self.counter = 0
+
+        if backend == "dlx":
+            # dlx_search() writes the first solution into the board, but solve_multiple() leaves the board as it was
+            backup = [[self.board[y][x] for x in range(self.size)] for y in range(self.size)]
+            self.counter = self.dlx_search(limit)
+            for y in range(self.size):
+                for x in range(self.size):
+                    self.board[y][x] = backup[y][x]
+            self.update_masks()
+            return
+        elif backend != "backtracking":
+            raise ValueError(f"Unknown solver backend: {backend}")
+
+        self.logic_placements = 0
+        self.search_placements = 0
+        self.update_masks()
+        self.search_all(self.empty_cells(), 0, mrv, propagate, limit)
+
+    def count_solutions(self, limit=None, backend="backtracking", cache=None):
+        """
+        Counts the solutions of the board without changing it, stopping early once limit solutions are found.
+        Use limit=2 to check if a board has exactly one solution
+        :param limit: int or None (count all solutions)
+        :param backend: String ("backtracking" or "dlx" for Dancing Links)
+        :param cache: canonical.SolutionCache (looked up for boards that take more than CACHE_AFTER_NODES nodes,
+                      9x9 boards only) or None
+        :return: int (number of solutions, at most limit)
+        """
+        self.solve_multiple(mrv=True, propagate=True, backend=backend, limit=limit, cache=cache)
+        return self.counter
+
+    def solve(self, mrv=False, propagate=False, backend="backtracking", cache=None):
+        """
+        Solves the board using a backtracking algorithm and sets the board to the first possible solution
+        :param mrv: Boolean (always branch on the cell with the fewest candidates)
+        :param propagate: Boolean (fill naked and hidden singles at every step before guessing)
+        :param backend: String ("backtracking" or "dlx" for Dancing Links)
+        :param cache: canonical.SolutionCache (looked up for boards that take more than CACHE_AFTER_NODES nodes,
+                      9x9 boards only) or None.
+                      A cached solution of an equivalent board is transformed back instead of searching
+        :return: Boolean (True if the board could be solved)
+        """
+        if cache is not None and self.box == 3:
+            return self.solve_within(mrv=mrv, propagate=propagate, backend=backend, cache=cache) == SOLVED
+
+        if backend == "dlx":
+            return self.dlx_search(limit=1) > 0
+        elif backend != "backtracking":
+            raise ValueError(f"Unknown solver backend: {backend}")
+
+        self.logic_placements = 0
+        self.search_placements = 0
+        self.update_masks()
+        return self.search_first(self.empty_cells(), 0, mrv, propagate)
+
+    def solve_within(self, nodes=None, deadline=None, mrv=True, propagate=True, backend="backtracking", cache=None):
+        """
+        Solves the board like solve(), but gives up after a number of search nodes or at a deadline,
+        so even boards that take the solver very long cannot block it. See Search for resuming a search
+        :param nodes: int (search nodes it may use) or None
+        :param deadline: float (time.perf_counter() value to give up at) or None
+        :param mrv: Boolean (always branch on the cell with the fewest candidates)
+        :param propagate: Boolean (fill naked and hidden singles before branching)
+        :param backend: String ("backtracking" or "dlx", which ignores mrv and propagate)
+        :param cache: canonical.SolutionCache (looked up for boards that take more than CACHE_AFTER_NODES nodes,
+                      9x9 boards only) or None. The search starts over after a miss, within the same nodes
+        :return: String (SOLVED, UNSOLVABLE or BUDGET_EXHAUSTED), the board is only changed if it was solved
+        """
+        if cache is not None and self.box == 3:
+            first = CACHE_AFTER_NODES if nodes is None else min(nodes, CACHE_AFTER_NODES)
+            status = self.solve_within(first, deadline, mrv, propagate, backend)
+            if status != BUDGET_EXHAUSTED:
+                return status
+
+            key, transform = canonical.canonicalize(self.board)
+            entry = cache.get(key)
+            if entry is not None and "solution" in entry:
+                if entry["solution"] is None:
+                    return UNSOLVABLE
+                self.board = canonical.revert(transform, entry["solution"])
+                self.update_masks()
+                return SOLVED
+            if first == nodes:
+                return BUDGET_EXHAUSTED
+
+            status = self.solve_within(None if nodes is None else nodes - first, deadline, mrv, propagate, backend)
+            if status != BUDGET_EXHAUSTED:
+                cache.put(key, solution=canonical.apply(transform, self.board) if status == SOLVED else None)
+            return status
+
+        if backend == "dlx":
+            sudoku = Sudoku(np.array(self.board, dtype=int))
+            status, found = sudoku.dlx_run(1, nodes, deadline)
+            if not found:
+                return BUDGET_EXHAUSTED if status == BUDGET_EXHAUSTED else UNSOLVABLE
+            self.board = sudoku.board
+            self.update_masks()
+            return SOLVED
+        if backend != "backtracking":
+            raise ValueError(f"Unknown solver backend: {backend}")
+
+        search = Search(Sudoku(np.array(self.board, dtype=int)), limit=1, mrv=mrv, propagate=propagate)
+        if search.run(nodes, deadline) == BUDGET_EXHAUSTED:
+            return BUDGET_EXHAUSTED
+        if search.solution is None:
+            return UNSOLVABLE
+        self.board = search.solution
+        self.update_masks()
+        return SOLVED
+
+    def count_within(self, limit=None, nodes=None, deadline=None, backend="backtracking", cache=None):
+        """
+        Counts the solutions like count_solutions(), but gives up after a number of search nodes or at a deadline
+        :param limit: int or None (count all solutions)
+        :param nodes: int (search nodes it may use) or None
+        :param deadline: float (time.perf_counter() value to give up at) or None
+        :param backend: String ("backtracking" or "dlx")
+        :param cache: canonical.SolutionCache (looked up for boards that take more than CACHE_AFTER_NODES nodes,
+                      9x9 boards only) or None. The count starts over after a miss, within the same nodes
+        :return: Tuple (String FINISHED or BUDGET_EXHAUSTED, int solutions found, at most limit)
+        """
+        if cache is not None and self.box == 3:
+            first = CACHE_AFTER_NODES if nodes is None else min(nodes, CACHE_AFTER_NODES)
+            status, found = self.count_within(limit, first, deadline, backend)
+            if status != BUDGET_EXHAUSTED:
+                return status, found
+
+            key = canonical.canonicalize(self.board)[0]
+            known = cache.get_count(key, limit)
+            if known is not None:
+                return FINISHED, known
+            if first == nodes:
+                return status, found
+
+            status, found = self.count_within(limit, None if nodes is None else nodes - first, deadline, backend)
+            if status != BUDGET_EXHAUSTED:
+                cache.put(key, count=found, limit=limit)
+            return status, found
+
+        if backend == "dlx":
+            return Sudoku(np.array(self.board, dtype=int)).dlx_run(limit, nodes, deadline)
+        if backend != "backtracking":
+            raise ValueError(f"Unknown solver backend: {backend}")
+
+        search = Search(Sudoku(np.array(self.board, dtype=int)), limit=limit, propagate=True)
+        return search.run(nodes, deadline), search.found
+
+    def is_correct(self, y, x, n):
+        """
+        Checks if number n is the right number for the empty cell [y][x].
+        This is a lookup if the solution is known, otherwise the board is solved with n put in
+        :param y: current row of board
+        :param x: current column of board
+        :param n: number that is being attempted to be put in the board
+        :return: Boolean
+        """
+        if self.solution is not None:
+            return self.solution[y][x] == n
+        if not self.possible(y, x, n):
+            return False
+
+        sudoku = Sudoku(np.array(self.board, dtype=int), self.difficulty)
+        sudoku.set_value(y, x, n)
+        return sudoku.solve(backend="dlx")
+
+    def make_board_integers(self):
+        """
+        Transforms all (float) numbers of the matrix into integers.
+        :return: None
+        """
+        self.board = self.board.astype(int)
+
+    def generate_new_board(self, backend="backtracking", band=None, tries=100, transform=False, clues=None,
+                           symmetric=False, seconds=None):
+        """
+        Combines the methods above to create a new random board to use.
+        With a band or a number of clues, boards are generated until one is rated inside the band
+        and has at most that many numbers left
+        :param backend: String (name of the solver backend, "backtracking" or "dlx")
+        :param band: Tuple (lowest rating, highest rating), see rater.py and DIFFICULTY_BANDS, or None
+        :param tries: int (boards generated at most to reach the band and clues, the closest one is kept)
+        :param transform: Boolean (transform the last board generated with the same settings
+                          instead of generating from scratch, see transforms.py)
+        :param clues: int (number of numbers to leave on the board) or None
+        :param symmetric: Boolean (remove numbers in pairs mirrored through the center)
+        :param seconds: float (time after which the closest board so far is kept) or None
+        :return: None
+        """
+        settings = (self.difficulty, self.box, band, clues, symmetric)
+        if transform and self.template is not None and self.template[0] == settings:
+            _, self.board, self.solution, self.rating = self.template
+            self.transform_board()
+            return
+
+        self.generate_from_scratch(backend, band, tries, clues, symmetric, seconds)
+        self.template = (settings, self.board.copy(), self.solution, self.rating)
+
+    def generate_from_scratch(self, backend="backtracking", band=None, tries=100, clues=None, symmetric=False,
+                              seconds=None):
+        """
+        Fills a board, removes numbers and, with a band or clues, repeats that until the board is rated inside
+        the band and has at most clues numbers left
+        :param backend: String (name of the solver backend, "backtracking" or "dlx")
+        :param band: Tuple (lowest rating, highest rating) or None
+        :param tries: int (boards generated at most to reach the band and clues, the closest one is kept)
+        :param clues: int (number of numbers to leave on the board) or None
+        :param symmetric: Boolean (remove numbers in pairs mirrored through the center)
+        :param seconds: float (time after which the closest board so far is kept) or None
+        :return: None
+        """
+        closest = None
+        deadline = None if seconds is None else time.perf_counter() + seconds
+        # only boards generated for a band are rated, a rating of an earlier board must not stay behind
+        self.rating = None
+
+        for _ in range(tries if band or clues else 1):
+            self.fill_board(backend)
+            # the removal keeps the solution unique, so the filled board is the solution of the puzzle
+            self.solution = self.board.astype(int)
+            self.remove_numbers(backend, symmetric, clues, deadline)
+            self.make_board_integers()
+
+            # how far the board is from the band and from the number of clues
+            distance = (0, 0)
+            if band is not None:
+                rating = self.rate()[0]
+                distance = (max(band[0] - rating, rating - band[1], 0), 0)
+            if clues is not None:
+                distance = (distance[0], max(int(np.count_nonzero(self.board)) - clues, 0))
+            if distance == (0, 0):
+                return
+            if closest is None or distance < closest[0]:
+                closest = (distance, self.board, self.solution, self.rating)
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+
+        _, self.board, self.solution, self.rating = closest
+        self.update_masks()
+
+    def transform_board(self, rng=None):
+        """
+        Turns the board and its solution into an equivalent board with a random transform, see transforms.py
+        :param rng: random.Random or the random module, None for the random number generator of the board
+        :return: None
+        """
+        if rng is None:
+            rng = self.rng
+        transform = transforms.random_transform(rng, self.box)
+        self.board = transforms.apply(transform, self.board)
+        if self.solution is not None:
+            self.solution = transforms.apply(transform, self.solution)
+        self.update_masks()
+
+    def rate(self):
+        """
+        Rates how hard the board is for a person, see rater.py
+        :return: Tuple (float rating, String hardest technique)
+        """
+        if self.box != 3:
+            raise ValueError("Ratings are only defined for 9x9 boards")
+        self.rating = rater.rate(self.board)
+        return self.rating
+
+    def fill_board(self, backend="backtracking"):
+        """
+        Fills the board with a random complete solution from the grid sampler, see grid_sampler.py.
+        The sampler is seeded from the random number generator of the board, so its seed decides the grid
+        :param backend: String (name of the solver backend, "backtracking" or "dlx"), the grid does not depend on it
+        :return: None
+        """
+        if self.sampler is None or self.sampler.box != self.box:
+            self.sampler = grid_sampler.GridSampler(self.rng.getrandbits(64), self.box)
+        self.board = self.sampler.grid()
+        self.update_masks()
+
+
+class SearchStats:
+    """
+    SearchStats collects how much work a TracingSudoku did.
+    """
+
+    def __init__(self):
+        self.nodes = 0
+        self.backtracks = 0
+        self.checks = 0
+        self.propagations = 0
+        self.logic_placements = 0
+        self.max_depth = 0
+        # seconds spent in every phase of generate_new_board()
+        self.phases = {}
+
+    def as_dict(self):
+        """
+        Returns the statistics as a dictionary, e.g. to save them as JSON
+        :return: Dictionary
+        """
+        return {"nodes": self.nodes, "backtracks": self.backtracks, "checks": self.checks,
+                "propagations": self.propagations, "logic_placements": self.logic_placements,
+                "max_depth": self.max_depth, "phases": dict(self.phases)}
+
+
+class Search:
+    """
+    The Search class runs the backtracking search of a Sudoku on an explicit stack instead of the call stack.
+    It can be stopped after any step and resumed later, run with a budget of search nodes or a deadline,
+    and saved as a dictionary (see as_dict() and from_dict()) to be resumed somewhere else.
+    The search works on the board of the Sudoku it is given, so that board changes while it runs.
+    """
+
+    def __init__(self, sudoku, limit=1, mrv=True, propagate=False):
+        self.sudoku = sudoku
+        # stop after this many solutions, None to go through the whole search
+        self.limit = limit
+        self.mrv = mrv
+        self.propagate = propagate
+        self.cells = sudoku.empty_cells()
+        # one [first cell, branching cell, candidates not tried yet] list per level of the search.
+        # The cells in between were filled by place_singles() and are emptied again when the level is left
+        self.stack = []
+        # True if the next step has to open a new level of the search
+        self.descend = True
+        self.found = 0
+        # first solution found, None until there is one
+        self.solution = None
+        self.finished = False
+        self.stats = SearchStats()
+        sudoku.update_masks()
+
+    def step(self):
+        """
+        Advances the search by one number put into a cell or taken out of it by the backtracking.
+        The singles filled by propagation are not reported
+        :return: Tuple (row, column, number or 0 if the cell was emptied), None once the search is finished
+        """
+        sudoku, cells = self.sudoku, self.cells
+        while not self.finished:
+            if self.descend:
+                self.descend = False
+                i = self.stack[-1][1] + 1 if self.stack else 0
+                filled = i
+                if self.propagate:
+                    filled = sudoku.place_singles(cells, i)
+                    if filled < 0:
+                        self.stats.backtracks += 1
+                        continue
+                if filled == len(cells):
+                    self.found += 1
+                    if self.solution is None:
+                        self.solution = np.array(sudoku.board, dtype=int)
+                    if self.limit is not None and self.found >= self.limit:
+                        self.finished = True
+                    else:
+                        sudoku.undo_placements(cells, i, filled)
+                else:
+                    free = sudoku.most_constrained(cells, filled) if self.mrv else sudoku.candidates(*cells[filled])
+                    self.stack.append([i, filled, free])
+                    self.stats.max_depth = max(self.stats.max_depth, len(self.stack))
+                continue
+
+            if not self.stack:
+                self.finished = True
+                break
+            level = self.stack[-1]
+            y, x = cells[level[1]]
+            n = int(sudoku.board[y][x])
+            if n:
+                # take back the number tried last on this level before trying the next one
+                sudoku.remove_value(y, x, n)
+                return y, x, 0
+
+            free = level[2]
+            if not free:
+                self.stack.pop()
+                sudoku.undo_placements(cells, level[0], level[1])
+                self.stats.backtracks += 1
+                continue
+            bit = free & -free
+            level[2] = free ^ bit
+            n = bit.bit_length() - 1
+            sudoku.set_value(y, x, n)
+            self.stats.nodes += 1
+            self.descend = True
+            return y, x, n
+        return None
+
+    def run(self, nodes=None, deadline=None):
+        """
+        Runs the search until it is finished or the budget is used up. It can be run again to go on
+        :param nodes: int (search nodes this run may use) or None
+        :param deadline: float (time.perf_counter() value to stop at) or None
+        :return: String (FINISHED or BUDGET_EXHAUSTED)
+        """
+        last = None if nodes is None else self.stats.nodes + nodes
+        while not self.finished:
+            if last is not None and self.stats.nodes >= last:
+                return BUDGET_EXHAUSTED
+            # a step with propagation on a large board can take milliseconds, so the clock is checked every step
+            if deadline is not None and time.perf_counter() > deadline:
+                return BUDGET_EXHAUSTED
+            self.step()
+        return FINISHED
+
+    def as_dict(self):
+        """
+        Returns the state of the search as a dictionary of plain lists and numbers, e.g. to save it as JSON
+        :return: Dictionary
+        """
+        return {
+            "board": np.array(self.sudoku.board, dtype=int).tolist(),
+            "limit": self.limit,
+            "mrv": self.mrv,
+            "propagate": self.propagate,
+            "cells": [list(cell) for cell in self.cells],
+            "stack": [list(level) for level in self.stack],
+            "descend": self.descend,
+            "found": self.found,
+            "solution": None if self.solution is None else self.solution.tolist(),
+            "finished": self.finished,
+            "stats": self.stats.as_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        """
+        Restores a search saved with as_dict()
+        :param state: Dictionary
+        :return: Search
+        """
+        search = cls(Sudoku(np.array(state["board"], dtype=int)), state["limit"], state["mrv"], state["propagate"])
+        search.cells = [tuple(cell) for cell in state["cells"]]
+        search.stack = [list(level) for level in state["stack"]]
+        search.descend = state["descend"]
+        search.found = state["found"]
+        search.solution = None if state["solution"] is None else np.array(state["solution"], dtype=int)
+        search.finished = state["finished"]
+        for name in ("nodes", "backtracks", "max_depth"):
+            setattr(search.stats, name, state["stats"][name])
+        return search
+
+
+class TracingSudoku(Sudoku):
+    """
+    TracingSudoku is a Sudoku that records SearchStats while it solves and generates boards:
+    search nodes, backtracks (nodes that found no solution), candidate checks, propagation steps,
+    the maximum search depth and the time of every generation phase.
+    The counting lives only in this subclass, so the plain Sudoku class does not pay for it.
+    Searches with the dlx backend are not counted.
+    """
+
+    def __init__(self, board=None, difficulty=2, box=3, rng=random):
+        self.stats = SearchStats()
+        self.depth = 0
+        super().__init__(board, difficulty, box, rng)
+
+    def candidates(self, y, x):
+        self.stats.checks += 1
+        return super().candidates(y, x)
+
+    def possible(self, y, x, n):
+        self.stats.checks += 1
+        return super().possible(y, x, n)
+
+    def most_constrained(self, cells, i):
+        # the scan over the remaining cells does not go through candidates()
+        self.stats.checks += len(cells) - i - 1
+        return super().most_constrained(cells, i)
+
+    def place_singles(self, cells, i):
+        self.stats.propagations += 1
+        filled = super().place_singles(cells, i)
+        if filled > i:
+            self.stats.logic_placements += filled - i
+        return filled
+
+    def enter(self):
+        """
+        Counts a search node and tracks the search depth
+        :return: None
+        """
+        self.stats.nodes += 1
+        self.depth += 1
+        if self.depth > self.stats.max_depth:
+            self.stats.max_depth = self.depth
+
+    def search_all(self, cells, i, mrv=False, propagate=False, limit=None):
+        self.enter()
+        found = self.counter
+        stop = super().search_all(cells, i, mrv, propagate, limit)
+        self.depth -= 1
+        if self.counter == found:
+            self.stats.backtracks += 1
+        return stop
+
+    def search_first(self, cells, i, mrv=False, propagate=False):
+        self.enter()
+        solved = super().search_first(cells, i, mrv, propagate)
+        self.depth -= 1
+        if not solved:
+            self.stats.backtracks += 1
+        return solved
+
+    def timed(self, phase, method, *args):
+        """
+        Runs a method and adds its runtime to the given phase
+        :param phase: String
+        :param method: bound method
+        :param args: arguments of the method
+        :return: return value of the method
+        """
+        start = time.perf_counter()
+        result = method(*args)
+        self.stats.phases[phase] = self.stats.phases.get(phase, 0) + time.perf_counter() - start
+        return result
+
+    def fill_board(self, backend="backtracking"):
+        return self.timed("fill", super().fill_board, backend)
+
+    def remove_numbers(self, backend="backtracking", symmetric=False, clues=None, deadline=None):
+        return self.timed("removal", super().remove_numbers, backend, symmetric, clues, deadline)
+
+    def make_board_integers(self):
+        return self.timed("int conversion", super().make_board_integers)
+
+    def rate(self):
+        return self.timed("rating", super().rate)
+
+
+# Sudoku object behind the module functions, kept in sync with the global variables above
+shared_sudoku = None
+# solutions and solution counts of recently solved boards, shared by equivalent boards (see canonical.py).
+# The module functions only use it when it is passed as cache=. Boards are only looked up once they took
+# CACHE_AFTER_NODES search nodes, so easy boards never pay for canonicalizing
+solution_cache = canonical.SolutionCache()
+
+
+def load_globals():
+    """
+    Points the shared Sudoku object at the global board, difficulty and box size.
+    The masks are rebuilt on every call, since the global board may have been changed in place.
+    The cheap queries possible() and check_board() read the global board directly instead
+    :return: Sudoku
+    """
+    global shared_sudoku
+
+    if shared_sudoku is None:
+        shared_sudoku = Sudoku(difficulty=difficulty, box=box)
+    shared_sudoku.difficulty = difficulty
+    if shared_sudoku.box != box:
+        shared_sudoku.resize(box)
+        shared_sudoku.board = np.array(np.zeros((shared_sudoku.size, shared_sudoku.size)))
+    if len(board) and shared_sudoku.board is not board:
+        shared_sudoku.board = board
+        shared_sudoku.solution = solution
+    shared_sudoku.update_masks()
+    return shared_sudoku
+
+
+def store_globals():
+    """
+    Copies the board and counters of the shared Sudoku object back into the global variables
     :return: None
     """
-    # initialize empty 9x9 board
     global board
-    board = np.array(np.zeros((9, 9)))
+    global counter
+    global solution
+    global logic_placements
+    global search_placements
 
-    # randomly populate the grid
-    populate_numbers = [i for i in range(9)]
-    shuffle(populate_numbers)
-    while populate_numbers:
-        y = randint(0, 8)
-        x = randint(0, 8)
-        if board[y][x] == 0:
-            board[y][x] = populate_numbers.pop()
+    board = shared_sudoku.board
+    counter = shared_sudoku.counter
+    solution = shared_sudoku.solution
+    logic_placements = shared_sudoku.logic_placements
+    search_placements = shared_sudoku.search_placements
+
+
+def generate_empty_board():
+    """
+    Generates an (almost) empty 9x9 board in the global board variable
+    :return: None
+    """
+    load_globals().generate_empty_board()
+    store_globals()
 
 
 def print_board():
@@ -76,161 +1344,249 @@ def get_difficulty():
 
 def check_board():
     """
-    Checks if the board is full
+    Checks if the global board is full. It reads the board directly, since rebuilding the masks costs more
     :return: Boolean
     """
-    global board
-
-    for y in range(9):
-        for x in range(9):
-            if board[y][x] == 0:
-                return False
-    return True
+    return all(value != 0 for row in board for value in row)
 
 
-def remove_numbers():
+def remove_numbers(backend="backtracking", symmetric=False, clues=None, deadline=None):
     """
-    Removes numbers from the board to eventually arrive at a non-filled-in board
+    Removes numbers from the global board to eventually arrive at a non-filled-in board
     The higher the difficulty int, the potentially harder to sudoku will be
+    :param backend: String (name of the solver backend used for the uniqueness check, "backtracking" or "dlx")
+    :param symmetric: Boolean (remove every cell together with its mirror image through the center)
+    :param clues: int (keep removing until only this many numbers are left) or None
+    :param deadline: float (time.perf_counter() value after which no more cells are tried) or None
     :return: None
     """
-    global board
-    global difficulty
-    difficulty *= 10
-    global counter
-    counter = 0
-
-    # while loop that removes numbers until grid has only one solution
-    while difficulty > 0:
-
-        # select a random cell that is not (already) empty
-        y = randint(0, 8)
-        x = randint(0, 8)
-        while board[y][x] == 0:
-            y = randint(0, 8)
-            x = randint(0, 8)
-
-        # save content of selected position and set it to 0
-        backup = board[y][x]
-        board[y][x] = 0
+    load_globals().remove_numbers(backend, symmetric, clues, deadline)
+    store_globals()
 
-        # count number of solutions of the current board
-        solve_multiple()
 
-        # we want a sudoku with only exactly one solution, so if it has a different number of solutions,
-        # put the last value back in
-        if counter != 1:
-            board[y][x] = backup
-            difficulty -= 1
+def update_masks():
+    """
+    Rebuilds the bitmasks used by possible().
+    Needs to be called whenever the global board is changed in place outside of this module
+    :return: None
+    """
+    load_globals().update_masks()
 
 
 def possible(y, x, n):
     """
-    Checks if number n can be input into [y][x] according to Sudoku rules
+    Checks if number n can be input into [y][x] of the global board according to Sudoku rules.
+    It scans the row, column and square directly, so it sees changes made to the board in place
+    without rebuilding the masks of the shared Sudoku object
     :param y: current row of board
     :param x: current column of board
     :param n: number that is being attempted to be put in the board
     :return: Boolean
     """
-    global board
+    size = len(board)
+    b = int(round(size ** 0.5))
+    if any(board[y][i] == n or board[i][x] == n for i in range(size)):
+        return False
+    y0, x0 = y - y % b, x - x % b
+    return not any(board[y0 + i][x0 + j] == n for i in range(b) for j in range(b))
 
-    # checks if the number already exists in the current row
-    for i in range(9):
-        if board[y][i] == n:
-            return False
-    # checks if the number already exists in the current column
-    for i in range(9):
-        if board[i][x] == n:
-            return False
-    # checks if the number already exists in the current square
-    x0 = (x // 3) * 3
-    y0 = (y // 3) * 3
-    for i in range(3):
-        for j in range(3):
-            if board[y0 + i][x0 + j] == n:
-                return False
-    # if n does not already exist in its row, column or square, it is possible in location [y][x]
-    return True
 
-
-def solve_multiple():
+def is_correct(y, x, n):
     """
-    Solves the board using a backtracking algorithm and
-    updates the global counter variable to the number of possible solutions
-    :return: None
+    Checks if number n is the right number for the empty cell [y][x] of the global board
+    :param y: current row of board
+    :param x: current column of board
+    :param n: number that is being attempted to be put in the board
+    :return: Boolean
     """
-    global board
-    global counter
-    counter = 0
-
-    for y in range(9):
-        for x in range(9):
-            if board[y][x] == 0:
-                for n in range(1, 10):
-                    if possible(y, x, n):
-                        board[y][x] = n
-                        solve_multiple()
-                        board[y][x] = 0
-                return False
+    return load_globals().is_correct(y, x, n)
 
-    counter += 1
+
+def dlx_search(limit=1):
+    """
+    Solves the global board using Dancing Links and sets it to the first solution found
+    :param limit: int (stop after this many solutions) or None (count all solutions)
+    :return: int (number of solutions found)
+    """
+    found = load_globals().dlx_search(limit)
+    store_globals()
+    return found
 
 
-def solve():
+def solve_multiple(mrv=False, propagate=False, backend="backtracking", limit=None, cache=None):
     """
-    Solves the board using a backtracking algorithm and sets the global board variable to the first possible solution
+    Solves the global board and updates the global counter variable to the number of possible solutions
+    :param mrv: Boolean (always branch on the cell with the fewest candidates)
+    :param propagate: Boolean (fill naked and hidden singles at every step before guessing)
+    :param backend: String ("backtracking" or "dlx" for Dancing Links)
+    :param limit: int (stop counting once limit solutions are found) or None (count all solutions)
+    :param cache: canonical.SolutionCache (e.g. solution_cache) or None
     :return: None
     """
-    global board
+    load_globals().solve_multiple(mrv, propagate, backend, limit, cache)
+    store_globals()
 
-    # base case
-    if check_board():
-        return True
 
-    # recursive case
-    else:
-        for y in range(9):
-            for x in range(9):
-                if board[y][x] == 0:
-                    for n in range(1, 10):
-                        if possible(y, x, n):
-                            board[y][x] = n
+def count_solutions(limit=None, backend="backtracking", cache=None):
+    """
+    Counts the solutions of the global board without changing it, stopping early once limit solutions are found
+    :param limit: int or None (count all solutions)
+    :param backend: String ("backtracking" or "dlx" for Dancing Links)
+    :param cache: canonical.SolutionCache (e.g. solution_cache) or None
+    :return: int (number of solutions, at most limit)
+    """
+    found = load_globals().count_solutions(limit, backend, cache)
+    store_globals()
+    return found
 
-                            if solve():
-                                return True
 
-                            board[y][x] = 0
-                    return False
+def solve(mrv=False, propagate=False, backend="backtracking", cache=None):
+    """
+    Solves the global board and sets it to the first possible solution
+    :param mrv: Boolean (always branch on the cell with the fewest candidates)
+    :param propagate: Boolean (fill naked and hidden singles at every step before guessing)
+    :param backend: String ("backtracking" or "dlx" for Dancing Links)
+    :param cache: canonical.SolutionCache (e.g. solution_cache) or None
+    :return: Boolean (True if the board could be solved)
+    """
+    solved = load_globals().solve(mrv, propagate, backend, cache)
+    store_globals()
+    return solved
 
 
 def make_board_integers():
     """
-    Transforms all (float) numbers of the matrix into integers.
+    Transforms all (float) numbers of the global board into integers.
     :return: None
     """
-    global board
-    board = board.astype(int)
+    load_globals().make_board_integers()
+    store_globals()
 
 
-def generate_new_board():
+def generate_new_board(backend="backtracking", band=None, transform=False, clues=None, symmetric=False, seconds=None):
     """
-    Combines custom functions to create a new random board to use
+    Creates a new random board in the global board variable, using the global difficulty
+    :param backend: String (name of the solver backend, "backtracking" or "dlx")
+    :param band: Tuple (lowest rating, highest rating) or None
+    :param transform: Boolean (transform the last generated board instead of generating from scratch)
+    :param clues: int (number of numbers to leave on the board) or None
+    :param symmetric: Boolean (remove numbers in pairs mirrored through the center)
+    :param seconds: float (time after which the closest board so far is kept) or None
     :return: None
     """
-    generate_empty_board()
-    solve()
-    remove_numbers()
-    make_board_integers()
+    load_globals().generate_new_board(backend, band, transform=transform, clues=clues, symmetric=symmetric,
+                                      seconds=seconds)
+    store_globals()
+
+
+def generate_seeded(task):
+    """
+    Generates one board in a worker process of generate_batch(), followed by its transformed variants
+    :param task: Tuple (seed, difficulty, backend, band, number of boards, clues, symmetric,
+                 rated: rate the boards that were not rated for the band)
+    :return: List of Dictionaries (records of the boards with their solutions and ratings, see puzzle_bank.record())
+    """
+    seed, level, backend, band, variants, clues, symmetric, rated = task
+    sudoku = Sudoku(difficulty=level, rng=random.Random(seed))
+    records = []
+    for _ in range(variants):
+        start = time.perf_counter()
+        sudoku.generate_new_board(backend, band, transform=True, clues=clues, symmetric=symmetric)
+        seconds = time.perf_counter() - start
+        rating = sudoku.rating
+        if rated and rating is None:
+            rating = sudoku.rate()
+        records.append(puzzle_bank.record(sudoku.board, sudoku.solution, level, rating, seconds=seconds))
+    return records
+
+
+def generate_batch(count, level, workers=None, path="puzzles.txt", seed=None, backend="backtracking", band=None,
+                   variants=1, clues=None, symmetric=False, bank=None):
+    """
+    Generates many boards on a pool of worker processes and streams them to a file, one board per line,
+    or into a puzzle bank. Every board gets its own random seed, so the workers never share random state
+    :param count: int (number of boards)
+    :param level: int (difficulty 1-5)
+    :param workers: int (number of processes, defaults to the number of cpus)
+    :param path: String (output file, 81 digits per line)
+    :param seed: int (seed for the board seeds, None for a random batch)
+    :param backend: String (name of the solver backend, "backtracking" or "dlx")
+    :param band: Tuple (lowest rating, highest rating) or None
+    :param variants: int (boards made from every generated board by transforming it, see transforms.py)
+    :param clues: int (number of numbers to leave on every board) or None
+    :param symmetric: Boolean (remove numbers in pairs mirrored through the center)
+    :param bank: String (puzzle bank file to add the boards to instead of writing path, see puzzle_bank.py) or None
+    :return: float (boards per second)
+    """
+    seeds = random.Random(seed)
+    # the text file only holds the boards, so they are only rated for the bank
+    tasks = ((seeds.getrandbits(64), level, backend, band, min(variants, count - first), clues, symmetric, bool(bank))
+             for first in range(0, count, variants))
+    start = time.perf_counter()
+    done = 0
+    # boards for the bank are added in chunks, every chunk in one transaction
+    pending = []
+    store = puzzle_bank.PuzzleBank(bank) if bank else None
+
+    with Pool(workers) as pool, (contextlib.nullcontext() if store else open(path, "w")) as file:
+        for records in pool.imap_unordered(generate_seeded, tasks, chunksize=4):
+            for entry in records:
+                if store:
+                    pending.append(entry)
+                else:
+                    file.write(entry["board"] + "\n")
+                done += 1
+                if done % 100 == 0:
+                    print(f"{done}/{count} boards, {done / (time.perf_counter() - start):.1f} boards per second")
+            if store and len(pending) >= 1000:
+                store.add(pending)
+                pending = []
+
+    if store:
+        store.add(pending)
+        store.close()
+        path = bank
+    rate = count / (time.perf_counter() - start)
+    print(f"Generated {count} boards in {path}, {rate:.1f} boards per second")
+    return rate
 
 
 if __name__ == "__main__":
     """
-    Asks user for input to set difficulty level, then
-    generates a new random boards and prints it. 
+    Without arguments, asks user for input to set difficulty level, then
+    generates a new random boards and prints it.
     Then proceeds to solve the board and print the solution.
+    With --count, generates a batch of boards into a file instead.
     """
-    get_difficulty()
-    generate_new_board()
-    print_board()
-    solve()
-    print_board()
+    parser = argparse.ArgumentParser(description="Sudoku solver and generator")
+    parser.add_argument("--count", type=int, help="number of boards to generate into --output")
+    parser.add_argument("--difficulty", type=int, default=2, choices=range(1, 6))
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--output", default="puzzles.txt")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--backend", default="backtracking", choices=["backtracking", "dlx"])
+    parser.add_argument("--band", type=float, nargs=2, metavar=("LOW", "HIGH"),
+                        help="only keep boards rated inside this band (see rater.py)")
+    parser.add_argument("--rated", action="store_true", help="use the rating band of the difficulty level")
+    parser.add_argument("--variants", type=int, default=1,
+                        help="boards made from every generated board by transforming it")
+    parser.add_argument("--clues", type=int, help="number of numbers to leave on every board, e.g. 24")
+    parser.add_argument("--symmetric", action="store_true", help="remove numbers in pairs mirrored through the center")
+    parser.add_argument("--bank", help="add the boards to this puzzle bank (SQLite file) instead of --output")
+    parser.add_argument("--box", type=int, default=3, help="size of the squares, 2 for 4x4 and 4 for 16x16 boards")
+    args = parser.parse_args()
+    if args.count and args.box != 3:
+        # the batch files hold 81-digit lines
+        parser.error("--count only generates 9x9 boards")
+    box = args.box
+    band = DIFFICULTY_BANDS[args.difficulty] if args.rated else args.band
+
+    if args.count:
+        generate_batch(args.count, args.difficulty, args.workers, args.output, args.seed, args.backend, band,
+                       args.variants, args.clues, args.symmetric, args.bank)
+    else:
+        get_difficulty()
+        generate_new_board(clues=args.clues, symmetric=args.symmetric)
+        print_board()
+        solve()
+        print_board()
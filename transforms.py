@@ -0,0 +1,53 @@
+"""
+This is the transform component of my Sudoku project.
+It turns a board into a different looking but equivalent board: the numbers are relabeled,
+rows are swapped within their band, columns within their stack, whole bands and stacks are swapped
+and the board can be transposed. None of these change the number of solutions or the techniques needed,
+so a verified unique puzzle can be multiplied into many new puzzles of the same difficulty.
+"""
+
+import random
+import numpy as np
+
+
+def shuffled_lines(rng=random, box=3):
+    """
+    Returns a random order of the rows (or columns) that keeps every band (or stack) together
+    :param rng: random.Random or the random module
+    :param box: int (size of the squares)
+    :return: List of box * box ints
+    """
+    bands = list(range(box))
+    rng.shuffle(bands)
+    order = []
+    for band in bands:
+        lines = list(range(box))
+        rng.shuffle(lines)
+        order += [band * box + line for line in lines]
+    return order
+
+
+def random_transform(rng=random, box=3):
+    """
+    Draws a random transform
+    :param rng: random.Random or the random module
+    :param box: int (size of the squares)
+    :return: Tuple (digit mapping array with 0 -> 0, row order, column order, Boolean transpose)
+    """
+    digits = list(range(1, box * box + 1))
+    rng.shuffle(digits)
+    return np.array([0] + digits), shuffled_lines(rng, box), shuffled_lines(rng, box), rng.random() < 0.5
+
+
+def apply(transform, board):
+    """
+    Applies a transform to a board, so the same transform can be applied to a puzzle and its solution
+    :param transform: Tuple (as returned by random_transform())
+    :param board: list or array
+    :return: int array (a new board)
+    """
+    digits, rows, cols, transpose = transform
+    board = np.asarray(board, dtype=int)[np.ix_(rows, cols)]
+    if transpose:
+        board = board.T
+    return digits[board]